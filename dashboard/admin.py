@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import Product, Order, Leave, Loan, ProductStatusHistory
+from .models import Product, Order, Leave, Loan, ProductStatusHistory, ExportJob, DashboardCounters, QueryReport, OutboxEmail, DailyRollup, RollupState, StaffAbsence
+from .timeline import make_current, delete_status
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -56,10 +57,59 @@ class ProductStatusHistoryAdmin(admin.ModelAdmin):
     list_filter = ['is_active', 'created_at', 'updated_by']
     search_fields = ['product__job_order', 'status']
     ordering = ['-created_at']
+
+    def save_model(self, request, obj, form, change):
+        # Saved inactive first: make_current retires the previous current
+        # entry before flagging this one
+        activate, obj.is_active = obj.is_active, False
+        super().save_model(request, obj, form, change)
+        if activate:
+            make_current(obj)
+
+    def delete_model(self, request, obj):
+        delete_status(obj)
                
     def has_delete_permission(self, request, obj=None):
         return True
 
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'requested_by', 'status', 'created_at', 'finished_at']
+    list_filter = ['status', 'kind']
+    readonly_fields = ['dedupe_key', 'created_at', 'started_at', 'finished_at']
+
+@admin.register(DashboardCounters)
+class DashboardCountersAdmin(admin.ModelAdmin):
+    list_display = ['products', 'orders', 'customers', 'leaves', 'pending_leaves', 'loans', 'pending_loans', 'reconciled_at']
+
+@admin.register(QueryReport)
+class QueryReportAdmin(admin.ModelAdmin):
+    list_display = ['view_name', 'method', 'status_code', 'query_count', 'duplicate_count', 'sql_ms', 'total_ms', 'over_budget', 'created_at']
+    list_filter = ['over_budget', 'view_name']
+    readonly_fields = ['duplicates']
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status']
+    readonly_fields = ['claim', 'last_error', 'created_at', 'sent_at']
+
+@admin.register(DailyRollup)
+class DailyRollupAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'day', 'department', 'request_type', 'status', 'count', 'amount', 'responded']
+    list_filter = ['kind', 'status', 'department']
+    date_hierarchy = 'day'
+
+@admin.register(RollupState)
+class RollupStateAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'high_water', 'refreshed_at']
+
+@admin.register(StaffAbsence)
+class StaffAbsenceAdmin(admin.ModelAdmin):
+    list_display = ['day', 'user', 'department', 'leave_type', 'leave']
+    list_filter = ['department', 'leave_type']
+    date_hierarchy = 'day'
+
 admin.site.unregister(User)
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(Order)
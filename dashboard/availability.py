@@ -0,0 +1,109 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Leave, StaffAbsence
+
+
+# Days written per INSERT when materializing leaves
+BATCH_SIZE = 1000
+
+
+def leave_days(leave):
+    day = leave.start_date
+    while day <= leave.end_date:
+        yield day
+        day += timedelta(days=1)
+
+
+def absence_rows(leaves):
+    for leave in leaves:
+        profile = getattr(leave.user, 'dashboard_profile', None)
+        department = profile.department if profile else ''
+        for day in leave_days(leave):
+            yield StaffAbsence(
+                leave_id=leave.id,
+                user_id=leave.user_id,
+                day=day,
+                department=department,
+                leave_type=leave.leave_type,
+            )
+
+
+def sync_leaves(leave_ids):
+    """
+    Rewrite the absence days of these leaves from their current rows:
+    approved leaves get one row per day, anything else gets none.
+    """
+    leave_ids = list(leave_ids)
+    if not leave_ids:
+        return 0
+    with transaction.atomic():
+        StaffAbsence.objects.filter(leave_id__in=leave_ids).delete()
+        approved = Leave.objects.filter(id__in=leave_ids, status='Approved')\
+            .select_related('user__dashboard_profile')
+        created = StaffAbsence.objects.bulk_create(absence_rows(approved), batch_size=BATCH_SIZE)
+    return len(created)
+
+
+def sync_leave(leave):
+    # Called on every save; only approved leaves, or ones that used to be,
+    # have rows to write or remove
+    if leave.status == 'Approved' or StaffAbsence.objects.filter(leave_id=leave.id).exists():
+        sync_leaves([leave.id])
+
+
+def move_department(user_id, department):
+    StaffAbsence.objects.filter(user_id=user_id).exclude(department=department)\
+        .update(department=department)
+
+
+def rebuild(batch_size=500):
+    """
+    Recreate every absence day from the approved leaves, a batch of
+    leaves at a time. Returns the number of days written.
+    """
+    StaffAbsence.objects.exclude(leave__status='Approved').delete()
+    ids = list(Leave.objects.filter(status='Approved').order_by('id').values_list('id', flat=True))
+    written = 0
+    for i in range(0, len(ids), batch_size):
+        written += sync_leaves(ids[i:i + batch_size])
+    return written
+
+
+def absences(start, end=None, department=None):
+    # Absence days between start and end inclusive, served by (day, department)
+    end = end or start
+    days = StaffAbsence.objects.filter(day__gte=start, day__lte=end)
+    if department:
+        days = days.filter(department=department)
+    return days
+
+
+def staff_out(day=None, department=None):
+    """
+    Active users away on approved leave on `day` (today by default),
+    optionally only those in `department`.
+    """
+    day = day or timezone.localdate()
+    return User.objects.filter(
+        Exists(absences(day, department=department).filter(user=OuterRef('pk'))),
+        is_active=True,
+    )
+
+
+def calendar(start, days, department=None):
+    """
+    {user: {day: leave type}} for everyone away at some point in the
+    `days` days from `start`, read in one query.
+    """
+    end = start + timedelta(days=days - 1)
+    rows = absences(start, end, department).select_related('user').order_by('user__username', 'day')
+    out = defaultdict(dict)
+    for row in rows:
+        out[row.user][row.day] = row.leave_type
+    return out
@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncWeek
+from django.utils import timezone
+
+from .models import Product, Order
+
+
+# Time windows the index charts can be asked for, in days
+CHART_WINDOWS = [7, 30, 90, 365]
+DEFAULT_CHART_WINDOW = 30
+CHART_TOP_PRODUCTS = 10
+
+
+def chart_cache_seconds():
+    return getattr(settings, 'CHART_CACHE_SECONDS', 300)
+
+
+def top_products(since, limit=CHART_TOP_PRODUCTS):
+    """
+    The `limit` products with the highest quantity, with everything else
+    folded into a single "Other" slice.
+    """
+    products = Product.objects.filter(date_created__gte=since, quantity__isnull=False)
+    top = list(
+        products.order_by('-quantity', 'id')
+        .values_list('id', 'name', 'job_order', 'quantity')[:limit]
+    )
+    labels = [name or job_order for _, name, job_order, _ in top]
+    data = [quantity for _, _, _, quantity in top]
+
+    rest = products.exclude(id__in=[product_id for product_id, _, _, _ in top])\
+        .aggregate(total=Coalesce(Sum('quantity'), 0))['total']
+    if rest:
+        labels.append('Other')
+        data.append(rest)
+    return {'labels': labels, 'data': data}
+
+
+def orders_over_time(since, days):
+    # Daily buckets for short windows, weekly ones beyond a month
+    bucket = TruncDate('date_created') if days <= 31 else TruncWeek('date_created')
+    rows = Order.objects.filter(date_created__gte=since)\
+        .annotate(period=bucket)\
+        .values('period')\
+        .annotate(orders=Count('id'), quantity=Coalesce(Sum('order_quantity'), 0))\
+        .order_by('period')
+    labels, orders, quantity = [], [], []
+    for row in rows:
+        period = row['period']
+        labels.append((period.date() if hasattr(period, 'date') else period).isoformat())
+        orders.append(row['orders'])
+        quantity.append(row['quantity'])
+    return {'labels': labels, 'orders': orders, 'quantity': quantity}
+
+
+def chart_data(days=DEFAULT_CHART_WINDOW):
+    """
+    Pre-aggregated series for the index page charts, cached per window.
+    """
+    if days not in CHART_WINDOWS:
+        days = DEFAULT_CHART_WINDOW
+    key = f'dashboard-charts:{days}'
+    data = cache.get(key)
+    if data is None:
+        since = timezone.now() - timedelta(days=days)
+        data = {
+            'days': days,
+            'generated_at': timezone.now().isoformat(),
+            'products': top_products(since),
+            'orders': orders_over_time(since, days),
+        }
+        cache.set(key, data, chart_cache_seconds())
+    return data
@@ -0,0 +1,57 @@
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DashboardCounters, Product, Order, Leave, Loan
+
+
+# The dashboard has always treated members of this group as customers
+CUSTOMER_GROUP_ID = 2
+
+COUNTERS_ID = 1
+
+
+def count_all():
+    return {
+        'products': Product.objects.count(),
+        'orders': Order.objects.count(),
+        'customers': User.objects.filter(groups=CUSTOMER_GROUP_ID).count(),
+        'leaves': Leave.objects.count(),
+        'pending_leaves': Leave.objects.filter(status='Pending').count(),
+        'loans': Loan.objects.count(),
+        'pending_loans': Loan.objects.filter(status='Pending').count(),
+    }
+
+
+def reconcile():
+    """
+    Recount everything from the source tables and overwrite the stored row.
+    """
+    values = dict(count_all(), reconciled_at=timezone.now())
+    # Plain writes rather than update_or_create, whose read-then-write
+    # transaction deadlocks on SQLite when two requests seed the row at once
+    if not DashboardCounters.objects.filter(id=COUNTERS_ID).update(**values):
+        try:
+            with transaction.atomic():
+                DashboardCounters.objects.create(id=COUNTERS_ID, **values)
+        except IntegrityError:
+            DashboardCounters.objects.filter(id=COUNTERS_ID).update(**values)
+    return DashboardCounters.objects.get(id=COUNTERS_ID)
+
+
+def get_counters():
+    counters = DashboardCounters.objects.filter(id=COUNTERS_ID).first()
+    return counters or reconcile()
+
+
+def bump(**deltas):
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updated = DashboardCounters.objects.filter(id=COUNTERS_ID)\
+        .update(**{name: F(name) + delta for name, delta in deltas.items()})
+    if not updated:
+        # First use: seed the row from a full count, which already
+        # includes the change that triggered this bump
+        reconcile()
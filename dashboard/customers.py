@@ -0,0 +1,69 @@
+from django.contrib.auth.models import User
+from django.db.models import Count, F, Max, Prefetch, Q, Sum
+
+from .counters import CUSTOMER_GROUP_ID
+from .models import Order
+
+
+# Orders whose job is still in progress
+OPEN_ORDER_STATUSES = ('pending', 'processing', 'shipped')
+
+# ?sort= values for the directory; prefix with '-' to reverse
+SORTS = {
+    'name': 'username',
+    'orders': 'order_count',
+    'spend': 'total_spend',
+    'last_order': 'last_order',
+    'open_jobs': 'open_jobs',
+}
+DEFAULT_SORT = '-last_order'
+
+
+def customer_directory(query=None):
+    """
+    Customers with their order count, total spend, last order date and
+    open job orders, all annotated onto one grouped query.
+    """
+    customers = User.objects.filter(groups=CUSTOMER_GROUP_ID)\
+        .select_related('profile')\
+        .annotate(
+            order_count=Count('order'),
+            total_spend=Sum('order__total_price'),
+            last_order=Max('order__date_created'),
+            open_jobs=Count(
+                'order__product',
+                filter=Q(order__order_status__in=OPEN_ORDER_STATUSES),
+                distinct=True,
+            ),
+        )
+    if query:
+        customers = customers.filter(
+            Q(username__icontains=query) | Q(email__icontains=query) |
+            Q(first_name__icontains=query) | Q(last_name__icontains=query)
+        )
+    return customers
+
+
+def sort_customers(customers, sort):
+    # Returns the sorted queryset and the sort actually applied
+    name = (sort or '').lstrip('-')
+    if name not in SORTS:
+        sort, name = DEFAULT_SORT, DEFAULT_SORT.lstrip('-')
+    field = F(SORTS[name])
+    # Customers without orders go last either way
+    if sort.startswith('-'):
+        ordering = field.desc(nulls_last=True)
+    else:
+        ordering = field.asc(nulls_last=True)
+    return customers.order_by(ordering, 'id'), sort
+
+
+def customer_history(pk):
+    """
+    One customer with the directory figures, their profile and every
+    order with its job order, in two queries.
+    """
+    orders = Order.objects.select_related('product').order_by('-date_created', '-id')
+    return customer_directory()\
+        .prefetch_related(Prefetch('order_set', queryset=orders, to_attr='history'))\
+        .get(pk=pk)
@@ -0,0 +1,137 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .availability import sync_leaves
+from .counters import bump
+from .loan_dashboard import loans_changed
+from .models import Leave, Loan
+from .outbox import queue_emails
+from .rollups import day_of, mark_changed
+from .search import index_objects
+
+
+# Accepted spellings of each decision, mapped to the status they set
+ACTIONS = {
+    'approve': 'Approved',
+    'approved': 'Approved',
+    'reject': 'Rejected',
+    'rejected': 'Rejected',
+    'deny': 'Rejected',
+}
+
+# Counter that tracks the requests still waiting for a decision
+PENDING_COUNTERS = {
+    Leave: 'pending_leaves',
+    Loan: 'pending_loans',
+}
+
+
+class DecisionError(ValueError):
+    pass
+
+
+def leave_notification(leave):
+    if leave.status == 'Approved':
+        subject = 'Leave Request Approved'
+        message = f'Your {leave.leave_type} leave request from {leave.start_date} to {leave.end_date} has been approved.'
+    elif leave.status == 'Rejected':
+        subject = 'Leave Request Rejected'
+        message = f'Your {leave.leave_type} leave request from {leave.start_date} to {leave.end_date} has been rejected.'
+    else:
+        return None
+    return subject, message
+
+
+def loan_notification(loan):
+    if loan.status == 'Approved':
+        subject = 'Loan Application Approved'
+        message = f'Your {loan.loan_type} loan application for ${loan.amount} has been approved.'
+    elif loan.status == 'Rejected':
+        subject = 'Loan Application Rejected'
+        message = f'Your {loan.loan_type} loan application for ${loan.amount} has been rejected.'
+    else:
+        return None
+    return subject, message
+
+
+NOTIFICATIONS = {
+    Leave: leave_notification,
+    Loan: loan_notification,
+}
+
+
+def parse_action(action):
+    status = ACTIONS.get(str(action or '').strip().lower())
+    if status is None:
+        raise DecisionError(f"Unknown action {action!r}; use approve or reject")
+    return status
+
+
+def bulk_decide(model, ids, action, user, message=None):
+    """
+    Approve or reject many pending leave or loan requests at once.
+
+    The status, approver, response date and message are set with a single
+    UPDATE and the applicants' emails are queued together in the same
+    transaction. Returns {id: outcome} for every id asked about, where the
+    outcome is the new status, 'not found', 'invalid id', or
+    'already <status>' for requests that were no longer pending.
+    """
+    status = parse_action(action)
+    results, wanted = {}, []
+    for raw in ids:
+        try:
+            wanted.append(int(raw))
+        except (TypeError, ValueError):
+            results[str(raw)] = 'invalid id'
+
+    now = timezone.now()
+    with transaction.atomic():
+        rows = model.objects.select_for_update()\
+            .filter(id__in=wanted)\
+            .values_list('id', 'status', 'applied_date')
+        current, applied = {}, {}
+        for pk, current_status, applied_date in rows:
+            current[pk] = current_status
+            applied[pk] = applied_date
+        pending = [pk for pk, current_status in current.items() if current_status == 'Pending']
+        fields = {'status': status, 'approved_by': user, 'response_date': now}
+        if message is not None:
+            fields['response_message'] = message
+        model.objects.filter(id__in=pending, status='Pending').update(**fields)
+
+        # select_for_update does not lock on SQLite, so a concurrent decision
+        # can take some of these first; only the rows this UPDATE set count
+        decided = list(
+            model.objects.filter(id__in=pending, status=status, approved_by=user, response_date=now)
+            .select_related('user')
+        )
+        changed = {obj.id for obj in decided}
+        if len(changed) < len(pending):
+            current.update(
+                model.objects.filter(id__in=set(pending) - changed).values_list('id', 'status')
+            )
+
+        # The UPDATE skips the save signals that keep these current
+        bump(**{PENDING_COUNTERS[model]: -len(changed)})
+        index_objects(model, changed)
+        mark_changed(model, [day_of(applied[pk]) for pk in changed])
+        if model is Loan and changed:
+            loans_changed()
+        if model is Leave:
+            sync_leaves(changed)
+
+        notify = NOTIFICATIONS[model]
+        queue_emails([
+            (*notify(obj), [obj.user.email])
+            for obj in decided
+        ])
+
+    for pk in wanted:
+        if pk in changed:
+            results[str(pk)] = status
+        elif pk in current:
+            results[str(pk)] = f'already {current[pk].lower()}'
+        else:
+            results[str(pk)] = 'not found'
+    return results
@@ -3,6 +3,7 @@ from django.shortcuts import redirect
 from django.core.exceptions import PermissionDenied
 from functools import wraps
 from django.contrib import messages
+from .roles import get_roles
 
 def auth_users(view_func):
     def wrapper(request, *args, **kwargs):
@@ -16,10 +17,7 @@ def auth_users(view_func):
 def allowed_users(allowed_roles=[]):
     def decorators(view_func):
         def wrapper(request, *args, **kwargs):
-            group = None
-            if request.user.groups.exists():
-                group = request.user.groups.all()[0].name
-            if group in allowed_roles:
+            if get_roles(request.user).has_any_role(*allowed_roles):
                 return view_func(request, *args, **kwargs)
             else:
                 return HttpResponse('You are not authorized to view this page. <a href="/index/">Click here to go back to dashboard</a>')
@@ -31,7 +29,7 @@ def allowed_users(allowed_roles=[]):
 def can_edit_user_data(view_func):
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        if request.user.groups.filter(name='SuperAdmin').exists():
+        if get_roles(request.user).has_role('SuperAdmin'):
             return view_func(request, *args, **kwargs)
         if request.method == 'GET':
             return view_func(request, *args, **kwargs)
@@ -41,7 +39,7 @@ def can_edit_user_data(view_func):
 
 def leave_manager_only(view_func):
     def wrapper_function(request, *args, **kwargs):       
-        if request.user.groups.filter(name__in=['Superuser', 'Leave Manager']).exists():
+        if get_roles(request.user).has_any_role('Superuser', 'Leave Manager'):
             return view_func(request, *args, **kwargs)
         messages.error(request, 'You are not authorized to view this page.')
         return redirect('dashboard-index')
@@ -51,7 +49,7 @@ def leave_manager_only(view_func):
 def can_manage_leave(view_func):
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        if request.user.groups.filter(name__in=['Leave', 'Admin', 'SuperAdmin']).exists():
+        if get_roles(request.user).has_any_role('Leave', 'Admin', 'SuperAdmin'):
             return view_func(request, *args, **kwargs)
         messages.error(request, 'You need leave management permissions to perform this action.')
         return redirect('dashboard-index')
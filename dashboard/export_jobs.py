@@ -0,0 +1,289 @@
+import hashlib
+import json
+import logging
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, close_old_connections, transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+
+from .exports import (
+    write_products_pdf, write_leaves_pdf, write_all_leaves_pdf,
+    write_loans_pdf, write_all_loans_pdf, write_product_view_pdf, PRODUCT_VIEW_TEMPLATE,
+)
+from .models import Product, Leave, Loan, ExportJob
+from .pdf_cache import cached_product_pdf, template_hash
+from .roles import get_roles
+from .tabular import PRODUCT_COLUMNS, LEAVE_COLUMNS, LOAN_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+
+def render_products(output, user, params):
+    products = Product.objects.select_related('created_by', 'approved_by')\
+        .order_by('-date_created')\
+        .iterator(chunk_size=500)
+    write_products_pdf(products, output)
+
+
+def render_leaves(output, user, params):
+    leaves = Leave.objects.filter(user=user).order_by('-applied_date')
+    write_leaves_pdf(leaves, output)
+
+
+def render_all_leaves(output, user, params):
+    leaves = Leave.objects.select_related('user', 'approved_by').order_by('-applied_date')
+    write_all_leaves_pdf(leaves, output)
+
+
+def render_loans(output, user, params):
+    loans = Loan.objects.filter(user=user).order_by('-applied_date')
+    write_loans_pdf(loans, output)
+
+
+def render_all_loans(output, user, params):
+    loans = Loan.objects.select_related('user', 'approved_by').order_by('-applied_date')
+    write_all_loans_pdf(loans, output)
+
+
+def render_product_view(output, user, params):
+    product = get_object_or_404(Product, job_order=params['job_id'])
+    path = cached_product_pdf('view', product, template_hash(PRODUCT_VIEW_TEMPLATE), write_product_view_pdf)
+    with open(path, 'rb') as cached:
+        shutil.copyfileobj(cached, output)
+
+
+def product_rows(user, params):
+    return Product.objects.order_by('-date_created', '-id')
+
+
+def leave_rows(user, params):
+    return Leave.objects.filter(user=user).order_by('-applied_date', '-id')
+
+
+def all_leave_rows(user, params):
+    return Leave.objects.order_by('-applied_date', '-id')
+
+
+def loan_rows(user, params):
+    return Loan.objects.filter(user=user).order_by('-applied_date', '-id')
+
+
+def all_loan_rows(user, params):
+    return Loan.objects.order_by('-applied_date', '-id')
+
+
+# Every export that can run in the background. `per_user` exports depend on
+# who asked for them, so they are only deduplicated per requesting user.
+# Those with `rows` and `columns` can also be downloaded as CSV or XLSX.
+EXPORTS = {
+    'products': {
+        'render': render_products,
+        'rows': product_rows,
+        'columns': PRODUCT_COLUMNS,
+        'filename': 'products.pdf',
+        'per_user': False,
+        'params': [],
+        'allowed': lambda user: user.has_perm('dashboard.can_export_products'),
+    },
+    'leaves': {
+        'render': render_leaves,
+        'rows': leave_rows,
+        'columns': LEAVE_COLUMNS,
+        'filename': 'leave_history.pdf',
+        'per_user': True,
+        'params': [],
+        'allowed': lambda user: user.has_perm('dashboard.can_export_products'),
+    },
+    'all_leaves': {
+        'render': render_all_leaves,
+        'rows': all_leave_rows,
+        'columns': LEAVE_COLUMNS,
+        'filename': 'all_leaves.pdf',
+        'per_user': False,
+        'params': [],
+        'allowed': lambda user: get_roles(user).has_role('Admin'),
+    },
+    'loans': {
+        'render': render_loans,
+        'rows': loan_rows,
+        'columns': LOAN_COLUMNS,
+        'filename': 'loan_history.pdf',
+        'per_user': True,
+        'params': [],
+        'allowed': lambda user: user.has_perm('dashboard.view_loan'),
+    },
+    'all_loans': {
+        'render': render_all_loans,
+        'rows': all_loan_rows,
+        'columns': LOAN_COLUMNS,
+        'filename': 'all_loans.pdf',
+        'per_user': False,
+        'params': [],
+        'allowed': lambda user: user.has_perms(['dashboard.view_loan', 'dashboard.change_loan']),
+    },
+    'product_view': {
+        'render': render_product_view,
+        'filename': '{job_id}_details.pdf',
+        'per_user': False,
+        'params': ['job_id'],
+        'allowed': lambda user: True,
+    },
+}
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'EXPORT_JOB_WORKERS', 2),
+            thread_name_prefix='export-job',
+        )
+    return _executor
+
+
+def export_filename(kind, params):
+    return EXPORTS[kind]['filename'].format(**params)
+
+
+def make_dedupe_key(kind, user, params):
+    owner = user.id if EXPORTS[kind]['per_user'] else None
+    payload = json.dumps([kind, owner, params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def can_access_job(user, job):
+    if job.requested_by_id == user.id:
+        return True
+    spec = EXPORTS.get(job.kind)
+    return spec is not None and not spec['per_user'] and spec['allowed'](user)
+
+
+def expire_stale_jobs():
+    """
+    Fail running jobs whose worker has been silent past
+    EXPORT_JOB_TIMEOUT_SECONDS, most likely because its process stopped,
+    so dedupe stops handing them out.
+    """
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'EXPORT_JOB_TIMEOUT_SECONDS', 900))
+    return ExportJob.objects.filter(status='running', started_at__lt=cutoff).update(
+        status='failed',
+        error='The export stopped before it finished; request it again',
+        finished_at=timezone.now(),
+    )
+
+
+def _enqueue(job):
+    if getattr(settings, 'EXPORT_JOBS_IN_PROCESS', True):
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, job.id))
+
+
+def submit_export(user, kind, params=None):
+    """
+    Queue an export for `user`, returning (job, created).
+
+    An identical export that is still pending or running is reused instead
+    of starting another one.
+    """
+    spec = EXPORTS[kind]
+    params = {name: str((params or {}).get(name, '')) for name in spec['params']}
+    dedupe_key = make_dedupe_key(kind, user, params)
+    expire_stale_jobs()
+
+    active = ExportJob.objects.filter(dedupe_key=dedupe_key, status__in=['pending', 'running'])
+    job = active.first()
+    if job is None:
+        try:
+            # The partial unique constraint on dedupe_key settles two
+            # identical requests racing each other
+            with transaction.atomic():
+                job = ExportJob.objects.create(
+                    kind=kind,
+                    params=params,
+                    dedupe_key=dedupe_key,
+                    requested_by=user,
+                )
+        except IntegrityError:
+            job = active.first()
+            if job is None:
+                raise
+        else:
+            _enqueue(job)
+            return job, True
+
+    stale = timezone.now() - timedelta(seconds=getattr(settings, 'EXPORT_JOB_REQUEUE_SECONDS', 300))
+    if job.status == 'pending' and job.created_at < stale:
+        # Whichever process queued it may be gone; claiming is atomic, so
+        # running it here as well never renders it twice
+        _enqueue(job)
+    return job, False
+
+
+def _run_in_thread(job_id):
+    try:
+        run_export_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def run_export_job(job_id):
+    # Claim the job atomically so a management command worker and the
+    # in-process pool never render the same job twice
+    started_at = timezone.now()
+    claimed = ExportJob.objects.filter(id=job_id, status='pending')\
+        .update(status='running', started_at=started_at)
+    if not claimed:
+        return None
+
+    job = ExportJob.objects.select_related('requested_by').get(id=job_id)
+    spec = EXPORTS.get(job.kind)
+    try:
+        if spec is None:
+            raise ValueError(f"Unknown export type: {job.kind}")
+        with tempfile.TemporaryFile() as output:
+            spec['render'](output, job.requested_by, job.params)
+            output.seek(0)
+            job.file.save(export_filename(job.kind, job.params), File(output), save=False)
+        job.status = 'done'
+    except Exception as e:
+        logger.exception(f"Export job {job.id} ({job.kind}) failed")
+        job.status = 'failed'
+        job.error = str(e)
+
+    job.finished_at = timezone.now()
+    # Only finish the claim made above; if expire_stale_jobs failed the job
+    # in the meantime, its outcome stands and this output is thrown away
+    finished = ExportJob.objects.filter(id=job.id, status='running', started_at=started_at).update(
+        status=job.status,
+        file=job.file.name or '',
+        error=job.error,
+        finished_at=job.finished_at,
+    )
+    if not finished:
+        logger.warning(f"Export job {job.id} ({job.kind}) expired before it finished; discarding its output")
+        if job.file:
+            job.file.delete(save=False)
+        return None
+    return job
+
+
+def run_pending_jobs(limit=None):
+    expire_stale_jobs()
+    job_ids = ExportJob.objects.filter(status='pending')\
+        .order_by('created_at')\
+        .values_list('id', flat=True)
+    if limit:
+        job_ids = job_ids[:limit]
+
+    processed = 0
+    for job_id in list(job_ids):
+        if run_export_job(job_id):
+            processed += 1
+    return processed
@@ -0,0 +1,353 @@
+import logging
+import os
+from django.conf import settings
+from django.template.loader import get_template
+from xhtml2pdf import pisa
+from reportlab.pdfgen import canvas
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Image, Spacer
+from .images import rendition_path, rendition_url
+
+logger = logging.getLogger(__name__)
+
+
+# Page geometry shared by the bulk exports
+PAGE_SIZE = landscape(A4)
+LEFT_MARGIN = 15
+RIGHT_MARGIN = 15
+TOP_MARGIN = 25
+BOTTOM_MARGIN = 25
+
+PRODUCT_VIEW_TEMPLATE = 'dashboard/product_view_pdf.html'
+
+# Rows buffered for the first page; comfortably more than fit on one page
+EXPORT_CHUNK_ROWS = 40
+
+
+PRODUCT_HEADERS = ['S/N', 'Date', 'Job Order Number', 'Job Name', 'Address', 'Contact', 'Package type/ Product', 'Colors',
+                   'Cutting/ Pouching', 'Thickness / Width', 'Sealing Type', 'Delivery qty', 'Price (NGN)', 'Qty (Kg)', 'Total (NGN)',
+                   'Est. Del', 'Act. Del', 'Cycle Time', 'Sub ID', 'Status', 'Created By', 'Approved By', 'Production Status']
+
+PRODUCT_COL_WIDTHS = [
+    0.2*inch,   # S/N
+    0.4*inch,   # Date
+    0.4*inch,   # Job Order
+    0.7*inch,   # Organization
+    0.7*inch,   # Address
+    0.5*inch,   # Contact
+    0.6*inch,   # Package type/ Product
+    0.4*inch,   # Colors
+    0.6*inch,   # Cutting/ Pouch Bag
+    0.35*inch,  # Printing Substrate/ Micron
+    0.35*inch,  # Sealing Type
+    0.5*inch,   # Job Title
+    0.45*inch,  # Price
+    0.3*inch,   # Qty
+    0.45*inch,  # Total
+    0.4*inch,   # Est. Del
+    0.4*inch,   # Act. Del
+    0.4*inch,   # Cycle Time
+    0.4*inch,   # Sub ID
+    0.4*inch,   # Status
+    0.45*inch,  # Created By
+    0.45*inch,  # Approved By
+    0.6*inch    # Production Status
+]
+
+PRODUCT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('LEFTPADDING', (0, 0), (-1, -1), 3),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 3),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 7),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+])
+
+para_style = ParagraphStyle(
+    'Normal',
+    fontSize=7,
+    leading=8,
+    wordWrap='CJK',
+    alignment=1,
+    encoding='utf-8'
+)
+
+header_style = ParagraphStyle(
+    'Header',
+    fontSize=8,
+    leading=9,
+    fontName='Helvetica-Bold',
+    alignment=1,
+    encoding='utf-8'
+)
+
+
+def product_row(product, index):
+    price = str(product.formatted_price()).replace('₦', 'NGN ')
+    total = str(product.formatted_total()).replace('₦', 'NGN ')
+
+    return [
+        str(index),
+        product.date_created.strftime('%d/%m/%y') if product.date_created else '',
+        Paragraph(str(product.job_order), para_style),
+        Paragraph(str(product.organization_name), para_style),
+        Paragraph(str(product.address), para_style),
+        Paragraph(str(product.contact_number), para_style),
+        Paragraph(str(product.print_product), para_style),
+        Paragraph(str(product.colors), para_style),
+        Paragraph(str(product.order_info), para_style),
+        Paragraph(str(product.size), para_style),
+        Paragraph(str(product.micron), para_style),
+        Paragraph(str(product.job_title), para_style),
+        Paragraph(price, para_style),
+        str(product.order_quantity),
+        Paragraph(total, para_style),
+        product.estimated_delivery_date.strftime('%d/%m/%y') if product.estimated_delivery_date else '',
+        product.actual_delivery_date.strftime('%d/%m/%y') if product.actual_delivery_date else '',
+        Paragraph(str(product.cycle_time), para_style) if product.cycle_time else '',
+        Paragraph(str(product.submission_id), para_style),
+        Paragraph(str(product.approval_status), para_style),
+        Paragraph(str(product.created_by.username), para_style) if product.created_by else '',
+        Paragraph(str(product.approved_by.username), para_style) if product.approved_by else '',
+        Paragraph(str(product.production_status), para_style) if product.production_status else ''
+    ]
+
+
+def write_table_pdf(output, title, headers, rows, col_widths, table_style, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Lay out `rows` (an iterator of table rows) as a paginated table on `output`.
+
+    Only about a page worth of rows is laid out at a time: each pass builds
+    a Table from the buffered rows, splits off whatever fits on the current
+    page, draws it and refills the buffer from the iterator. The canvas
+    still keeps every finished page in memory until save(), so peak memory
+    grows with the page count; only the table layout per page is bounded.
+    """
+    canv = canvas.Canvas(output, pagesize=PAGE_SIZE, pageCompression=1)
+    page_width, page_height = PAGE_SIZE
+    frame_width = page_width - LEFT_MARGIN - RIGHT_MARGIN
+    top = page_height - TOP_MARGIN
+
+    styles = getSampleStyleSheet()
+    title_style = styles['Title']
+    title_style.fontSize = 14
+    title_style.spaceAfter = 30
+
+    heading = Paragraph(title, title_style)
+    _, height = heading.wrapOn(canv, frame_width, top - BOTTOM_MARGIN)
+    heading.drawOn(canv, LEFT_MARGIN, top - height)
+    y = top - height - title_style.spaceAfter
+
+    header_row = [Paragraph(header, header_style) for header in headers]
+    rows = iter(rows)
+    buffer = []
+    target = chunk_rows
+    exhausted = False
+
+    while True:
+        while not exhausted and len(buffer) < target:
+            row = next(rows, None)
+            if row is None:
+                exhausted = True
+            else:
+                buffer.append(row)
+        if not buffer:
+            break
+
+        table = Table([header_row] + buffer, repeatRows=1, colWidths=col_widths)
+        table.setStyle(table_style)
+        available = y - BOTTOM_MARGIN
+        parts = table.split(frame_width, available)
+
+        if parts and parts[0] is table:
+            if not exhausted:
+                # Page is not full yet; pull in more rows before drawing
+                target = len(buffer) * 2
+                continue
+            _, height = table.wrapOn(canv, frame_width, available)
+            table.drawOn(canv, LEFT_MARGIN, y - height)
+            break
+
+        if not parts and y < top:
+            # Not even one row fits below what is already drawn
+            canv.showPage()
+            y = top
+            continue
+        if parts:
+            page_part = parts[0]
+        else:
+            # A single row taller than a whole page; draw it and let it overflow
+            page_part = Table([header_row] + buffer[:1], repeatRows=1, colWidths=col_widths)
+            page_part.setStyle(table_style)
+
+        _, height = page_part.wrapOn(canv, frame_width, available)
+        page_part.drawOn(canv, LEFT_MARGIN, y - height)
+        fitted = max(page_part._nrows - 1, 1)
+        buffer = buffer[fitted:]
+        # Next page most likely holds about as many rows as this one did
+        target = min(chunk_rows, fitted + fitted // 2 + 1)
+        canv.showPage()
+        y = top
+
+    canv.save()
+    return output
+
+
+def write_single_product_pdf(product, output):
+    doc = SimpleDocTemplate(output, pagesize=PAGE_SIZE, leftMargin=LEFT_MARGIN, rightMargin=RIGHT_MARGIN,
+                            topMargin=TOP_MARGIN, bottomMargin=BOTTOM_MARGIN)
+    elements = [_report_title(f"City prints Job Order #{product.job_order}")]
+
+    if product.image:
+        try:
+            img = Image(rendition_path(product.image, 'print'), width=4*inch, height=3*inch)
+            elements.append(img)
+            elements.append(Spacer(1, 12))
+        except Exception as e:
+            logger.warning(f"Error loading image for {product.job_order}: {e}")
+
+    data = [[Paragraph(header, header_style) for header in PRODUCT_HEADERS], product_row(product, 1)]
+    table = Table(data, repeatRows=1, colWidths=PRODUCT_COL_WIDTHS)
+    table.setStyle(PRODUCT_TABLE_STYLE)
+    elements.append(table)
+
+    doc.build(elements)
+    return output
+
+
+def write_products_pdf(products, output, title="City prints Product Records"):
+    rows = (product_row(product, index) for index, product in enumerate(products, start=1))
+    return write_table_pdf(output, title, PRODUCT_HEADERS, rows, PRODUCT_COL_WIDTHS, PRODUCT_TABLE_STYLE)
+
+
+class ExportError(Exception):
+    pass
+
+
+def _report_doc(output):
+    return SimpleDocTemplate(output, pagesize=PAGE_SIZE, leftMargin=LEFT_MARGIN, rightMargin=RIGHT_MARGIN,
+                             topMargin=TOP_MARGIN, bottomMargin=BOTTOM_MARGIN)
+
+
+def _report_title(text):
+    styles = getSampleStyleSheet()
+    title_style = styles['Title']
+    title_style.fontSize = 14
+    title_style.spaceAfter = 30
+    return Paragraph(text, title_style)
+
+
+def _report_table_style(header_size, body_size):
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), header_size),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), body_size),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+
+
+def _write_report(output, title, headers, data, header_size, body_size):
+    doc = _report_doc(output)
+    data.insert(0, headers)
+    table = Table(data)
+    table.setStyle(_report_table_style(header_size, body_size))
+    doc.build([_report_title(title), table])
+    return output
+
+
+def write_leaves_pdf(leaves, output):
+    headers = ['Leave Type', 'Start Date', 'End Date', 'Status', 'Applied Date']
+    data = [[leave.leave_type, leave.start_date, leave.end_date, leave.status, leave.applied_date.strftime('%Y-%m-%d')]
+            for leave in leaves]
+    return _write_report(output, "Leave History Report", headers, data, 14, 12)
+
+
+def write_all_leaves_pdf(leaves, output):
+    headers = ['Staff', 'Leave Type', 'Start Date', 'End Date', 'Status', 'Applied Date', 'Approved By']
+    data = [[
+        leave.user.username,
+        leave.leave_type,
+        leave.start_date,
+        leave.end_date,
+        leave.status,
+        leave.applied_date.strftime('%Y-%m-%d'),
+        leave.approved_by.username if leave.approved_by else '-'
+    ] for leave in leaves]
+    return _write_report(output, "All Leave Requests Report", headers, data, 12, 10)
+
+
+def write_loans_pdf(loans, output):
+    headers = ['Loan Type', 'Amount', 'Start Date', 'End Date', 'Status', 'Applied Date']
+    data = [[loan.loan_type, f"${loan.amount}", loan.start_date, loan.end_date,
+             loan.status, loan.applied_date.strftime('%Y-%m-%d')] for loan in loans]
+    return _write_report(output, "Loan History Report", headers, data, 14, 12)
+
+
+def write_all_loans_pdf(loans, output):
+    headers = ['Staff', 'Loan Type', 'Amount', 'Start Date', 'End Date', 'Status', 'Applied Date', 'Approved By']
+    data = [[
+        loan.user.username,
+        loan.loan_type,
+        f"${loan.amount}",
+        loan.start_date,
+        loan.end_date,
+        loan.status,
+        loan.applied_date.strftime('%Y-%m-%d'),
+        loan.approved_by.username if loan.approved_by else '-'
+    ] for loan in loans]
+    return _write_report(output, "All Loan Applications Report", headers, data, 12, 10)
+
+
+def fetch_resources(uri, rel):
+    """
+    Convert HTML URIs to absolute system paths for PDF generation
+    """
+    if uri.startswith(settings.MEDIA_URL):
+        path = os.path.join(settings.MEDIA_ROOT, uri.replace(settings.MEDIA_URL, ""))
+    elif uri.startswith(settings.STATIC_URL):
+        path = os.path.join(settings.STATIC_ROOT, uri.replace(settings.STATIC_URL, ""))
+    elif uri.startswith("http://") or uri.startswith("https://"):
+        path = uri
+    else:
+        path = os.path.join(settings.STATIC_ROOT, uri)
+
+    return path
+
+
+def write_product_view_pdf(product, output):
+    # Media URLs are resolved to files on disk by fetch_resources, so
+    # rendering does not depend on a request or on fetching over HTTP
+    context = {
+        'product': product,
+        'image_url': rendition_url(product.image, 'print') if product.image else None,
+    }
+    html = get_template(PRODUCT_VIEW_TEMPLATE).render(context)
+
+    pisa_status = pisa.CreatePDF(
+        html,
+        dest=output,
+        link_callback=fetch_resources,
+        encoding='utf-8'
+    )
+    if pisa_status.err:
+        raise ExportError('PDF generation error')
+    return output
@@ -71,6 +71,7 @@ class ProductForm(forms.ModelForm):
         
         # Make image field not required
         self.fields['image'].required = False
+        self.fields['job_order'].help_text = 'Leave blank to use the next job order number'
         
         # Update field labels
         self.fields['print_product'].label = 'Package type/ Product'
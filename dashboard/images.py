@@ -0,0 +1,99 @@
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+
+# name -> (width, height, crop). Sizes are twice the largest size each one
+# is displayed at so they stay sharp on high density screens; `print` is
+# the 4x3 inch PDF slot at 300 dpi.
+RENDITIONS = {
+    'thumb': (100, 100, True),
+    'list': (600, 600, False),
+    'print': (1200, 900, False),
+}
+
+RENDITIONS_DIR = 'renditions'
+
+
+def _rendition_name(image, name):
+    # The source name is kept whole so foo.jpg and foo.JPG get separate
+    # renditions. PNGs stay PNG so transparent backgrounds survive.
+    ext = '.png' if image.name.lower().endswith('.png') else '.jpg'
+    return f'{RENDITIONS_DIR}/{name}/{image.name}{ext}'
+
+
+def _is_fresh(source_path, path):
+    try:
+        return os.path.getmtime(path) >= os.path.getmtime(source_path)
+    except OSError:
+        return False
+
+
+def generate_rendition(image, name):
+    """
+    Write the `name` rendition of `image` under MEDIA_ROOT and return its
+    path relative to MEDIA_ROOT. Existing up to date renditions are reused.
+    """
+    width, height, crop = RENDITIONS[name]
+    relative = _rendition_name(image, name)
+    path = os.path.join(settings.MEDIA_ROOT, relative)
+    source_path = image.path
+
+    if _is_fresh(source_path, path):
+        return relative
+
+    with Image.open(source_path) as img:
+        # Let the JPEG decoder downscale while decoding instead of
+        # expanding the full resolution photo into memory first
+        img.draft('RGB', (width, height))
+        img = ImageOps.exif_transpose(img)
+        if crop:
+            img = ImageOps.fit(img, (width, height), Image.LANCZOS)
+        else:
+            img.thumbnail((width, height), Image.LANCZOS)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                if relative.endswith('.png'):
+                    img.save(output, 'PNG', optimize=True)
+                else:
+                    img.convert('RGB').save(output, 'JPEG', quality=85, optimize=True, progressive=True)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    return relative
+
+
+def generate_renditions(image):
+    for name in RENDITIONS:
+        try:
+            generate_rendition(image, name)
+        except Exception as e:
+            logger.warning(f"Could not build {name} rendition of {image.name}: {e}")
+
+
+def rendition_url(image, name):
+    if not image:
+        return ''
+    try:
+        return settings.MEDIA_URL + generate_rendition(image, name)
+    except Exception as e:
+        logger.warning(f"Could not build {name} rendition of {image.name}: {e}")
+        return image.url
+
+
+def rendition_path(image, name):
+    try:
+        return os.path.join(settings.MEDIA_ROOT, generate_rendition(image, name))
+    except Exception as e:
+        logger.warning(f"Could not build {name} rendition of {image.name}: {e}")
+        return image.path
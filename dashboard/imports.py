@@ -0,0 +1,249 @@
+import codecs
+import csv
+import os
+import zipfile
+from collections import namedtuple
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from .counters import bump
+from .forms import ProductForm
+from .models import Product, generate_job_orders, generate_submission_ids, reserve_job_orders
+from .search import index_objects
+from .tabular import Echo
+
+
+# Columns a job order import may carry. Headers are matched on the field
+# name or on the label used by the job order form, ignoring case.
+IMPORT_FIELDS = [
+    'job_order', 'name', 'category', 'organization_name', 'address', 'contact_number',
+    'print_product', 'colors', 'order_info', 'size', 'micron', 'job_title',
+    'price', 'quantity', 'order_quantity', 'date_created', 'estimated_delivery_date',
+    'actual_delivery_date', 'approval_status', 'production_status',
+]
+
+NUMERIC_FIELDS = {'price', 'quantity', 'order_quantity'}
+
+DEFAULT_BATCH_SIZE = 500
+
+RowError = namedtuple('RowError', ['row', 'field', 'message', 'job_order'])
+
+
+class ImportFileError(Exception):
+    pass
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.valid = 0
+        self.created = 0
+        self.errors = []
+
+    @property
+    def failed_rows(self):
+        return len({error.row for error in self.errors})
+
+    def report_lines(self):
+        writer = csv.writer(Echo())
+        yield writer.writerow(['Row', 'Job Order', 'Field', 'Error'])
+        for error in self.errors:
+            yield writer.writerow([error.row, error.job_order, error.field, error.message])
+
+
+def header_map():
+    labels = {}
+    form_labels = dict(ProductForm.Meta.labels)
+    for name in IMPORT_FIELDS:
+        labels[name] = name
+        labels[Product._meta.get_field(name).verbose_name.lower()] = name
+        if name in form_labels:
+            labels[form_labels[name].lower()] = name
+    return labels
+
+
+def read_rows(fileobj, filename):
+    """
+    Yield (row number, {field: raw value}) for each data row of a CSV or
+    XLSX upload without loading the whole file. Unknown columns are ignored.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        rows = _csv_rows(fileobj)
+    elif extension == '.xlsx':
+        rows = _xlsx_rows(fileobj)
+    else:
+        raise ImportFileError('Upload a .csv or .xlsx file')
+
+    headers = next(rows, None)
+    if not headers:
+        raise ImportFileError('The file is empty')
+    known = header_map()
+    columns = [known.get(str(header or '').strip().lower()) for header in headers]
+    if not any(columns):
+        raise ImportFileError('None of the column headers match a job order field')
+
+    for number, row in enumerate(rows, start=2):
+        values = {field: value for field, value in zip(columns, row) if field}
+        if any(value not in (None, '') for value in values.values()):
+            yield number, values
+
+
+def _csv_rows(fileobj):
+    # Read the file through once first, so an encoding or quoting problem
+    # is reported before any batch has been written
+    reader = csv.reader(codecs.iterdecode(fileobj, 'utf-8-sig'))
+    try:
+        for _ in reader:
+            pass
+    except UnicodeDecodeError:
+        raise ImportFileError('The file is not UTF-8 text; in Excel save it as "CSV UTF-8" and upload it again')
+    except csv.Error as error:
+        raise ImportFileError(f'Line {reader.line_num} could not be read as CSV: {error}')
+    fileobj.seek(0)
+    return csv.reader(codecs.iterdecode(fileobj, 'utf-8-sig'))
+
+
+def _xlsx_rows(fileobj):
+    try:
+        # read_only streams the sheet instead of building it all in memory
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError):
+        raise ImportFileError('The file could not be read as an .xlsx workbook')
+    return _sheet_rows(workbook)
+
+
+def _sheet_rows(workbook):
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def clean_row(values):
+    """
+    Convert raw cell values with the model fields' own validation. Returns
+    the cleaned values and a list of (field, message) problems.
+    """
+    cleaned, problems = {}, []
+    for name, value in values.items():
+        field = Product._meta.get_field(name)
+        if isinstance(value, str):
+            value = value.strip()
+            if name in NUMERIC_FIELDS:
+                value = value.replace(',', '').replace('₦', '')
+        if value in (None, ''):
+            # Left to the model default, as fields missing from the form are
+            continue
+        try:
+            value = field.clean(value, None)
+        except ValidationError as error:
+            problems.append((name, '; '.join(error.messages)))
+            continue
+        if name in NUMERIC_FIELDS and value < 0:
+            problems.append((name, 'Must not be negative'))
+            continue
+        if name == 'date_created' and value is not None and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        cleaned[name] = value
+    return cleaned, problems
+
+
+def _derive(products):
+    # Totals and cycle times for the whole batch in one pass per column,
+    # the same rules as Product.calculate_total and calculate_cycle_time
+    prices = [product.price for product in products]
+    quantities = [product.order_quantity for product in products]
+    totals = [
+        price * quantity if price is not None and quantity is not None else None
+        for price, quantity in zip(prices, quantities)
+    ]
+    estimated = [product.estimated_delivery_date for product in products]
+    actual = [product.actual_delivery_date for product in products]
+    cycle_times = [
+        done - due if due and done else None
+        for due, done in zip(estimated, actual)
+    ]
+    for product, total, cycle_time in zip(products, totals, cycle_times):
+        product.total = total
+        product.cycle_time = cycle_time
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def import_job_orders(fileobj, filename, user=None, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """
+    Create job orders from a CSV or XLSX file. Each batch is validated
+    together and written with one bulk_create in its own transaction, so
+    a bad row only costs that row and a failed write only that batch.
+    """
+    result = ImportResult()
+    seen = set()
+
+    for batch in _batches(read_rows(fileobj, filename), batch_size):
+        result.rows += len(batch)
+        valid = []
+        for number, values in batch:
+            cleaned, problems = clean_row(values)
+            job_order = cleaned.get('job_order') or ''
+            for name, message in problems:
+                result.errors.append(RowError(number, name, message, job_order))
+            if problems:
+                continue
+            if job_order:
+                if job_order in seen:
+                    result.errors.append(RowError(number, 'job_order', 'Repeated earlier in the file', job_order))
+                    continue
+                seen.add(job_order)
+            valid.append((number, cleaned))
+
+        # One query for the whole batch instead of a lookup per row
+        wanted = [cleaned['job_order'] for _, cleaned in valid if cleaned.get('job_order')]
+        taken = set(Product.objects.filter(job_order__in=wanted).values_list('job_order', flat=True))
+        products = []
+        for number, cleaned in valid:
+            if cleaned.get('job_order') in taken:
+                result.errors.append(RowError(number, 'job_order', 'A job order with this number already exists', cleaned['job_order']))
+                continue
+            products.append(Product(created_by=user, **cleaned))
+
+        result.valid += len(products)
+        if not products or dry_run:
+            continue
+
+        _derive(products)
+        try:
+            with transaction.atomic():
+                # Numbers given in the file are taken before any are generated
+                reserve_job_orders([product.job_order for product in products if product.job_order])
+                blank = [product for product in products if not product.job_order]
+                for product, job_order in zip(blank, generate_job_orders(len(blank))):
+                    product.job_order = job_order
+                for product, submission_id in zip(products, generate_submission_ids(len(products))):
+                    product.submission_id = submission_id
+                created = Product.objects.bulk_create(products)
+        except IntegrityError as error:
+            # Most likely a job order taken while this batch was being read
+            first, last = batch[0][0], batch[-1][0]
+            result.errors.append(RowError(first, '', f'Rows {first}-{last} were not imported: {error}', ''))
+            continue
+
+        result.created += len(created)
+        # bulk_create skips the signals that keep these in sync
+        bump(products=len(created))
+        index_objects(Product, [product.pk for product in created if product.pk])
+
+    result.errors.sort(key=lambda error: error.row)
+    return result
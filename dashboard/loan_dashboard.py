@@ -0,0 +1,93 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import Sequence
+from .rollups import daily_trend
+from .stats import LoanStats
+
+logger = logging.getLogger(__name__)
+
+# A snapshot of the figures, tagged with the loan version it was computed
+# from. The version is a database counter bumped in the same transaction
+# as every loan save or delete, so all processes see a change together;
+# each keeps serving its stale snapshot while a background refresh
+# replaces it.
+CACHE_KEY = 'loan-dashboard-stats'
+VERSION_SEQUENCE = 'loan-dashboard-version'
+REFRESH_LOCK_KEY = 'loan-dashboard-refreshing'
+
+
+def cache_seconds():
+    return getattr(settings, 'LOAN_DASHBOARD_CACHE_SECONDS', 3600)
+
+
+def loans_changed():
+    Sequence.allocate(VERSION_SEQUENCE)
+
+
+def current_version():
+    return Sequence.objects.filter(name=VERSION_SEQUENCE).values_list('value', flat=True).first() or 0
+
+
+def refresh():
+    # Read the version first: a loan saved while this runs leaves the
+    # new snapshot stale, so it is refreshed again
+    version = current_version()
+    now = timezone.now()
+    snapshot = {
+        'version': version,
+        'month': now.strftime('%Y-%m'),
+        'computed_at': now,
+        'context': dict(LoanStats(now=now).as_context(), daily_trend=daily_trend('loan')),
+    }
+    cache.set(CACHE_KEY, snapshot, cache_seconds())
+    return snapshot
+
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='loan-dashboard')
+    return _executor
+
+
+def _refresh_in_thread():
+    try:
+        refresh()
+    except Exception:
+        logger.exception("Refreshing the loan dashboard failed")
+    finally:
+        cache.delete(REFRESH_LOCK_KEY)
+        close_old_connections()
+
+
+def schedule_refresh():
+    # cache.add only succeeds for the first caller, so one stale snapshot
+    # triggers one recomputation however many people are looking at it
+    if cache.add(REFRESH_LOCK_KEY, True, 120):
+        _get_executor().submit(_refresh_in_thread)
+
+
+def loan_dashboard_context():
+    """
+    The admin loan dashboard figures. Current snapshots are served from
+    the cache; a stale one is served while it is recomputed in the
+    background, and only a missing one is computed in the request.
+    """
+    snapshot = cache.get(CACHE_KEY)
+    if snapshot is None:
+        snapshot = refresh()
+    elif snapshot['version'] != current_version() or snapshot['month'] != timezone.now().strftime('%Y-%m'):
+        if getattr(settings, 'LOAN_DASHBOARD_REFRESH_IN_PROCESS', True):
+            schedule_refresh()
+        else:
+            snapshot = refresh()
+    return dict(snapshot['context'], stats_computed_at=snapshot['computed_at'])
@@ -0,0 +1,168 @@
+import json
+import math
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+
+from dashboard.management.commands.seed_data import flush_seed_data
+from dashboard.query_budget import QueryRecorder
+
+
+# (label, url name, url kwargs) for every view the benchmark drives
+TARGETS = [
+    ('index', 'dashboard-index', {}),
+    ('products', 'dashboard-products', {}),
+    ('orders', 'dashboard-order', {}),
+    ('manage_leaves', 'manage-leaves', {}),
+    ('admin_leave_dashboard', 'admin_leave_dashboard', {}),
+    ('admin_loan_dashboard', 'admin-loan-dashboard', {}),
+    ('loan_list', 'loan-list', {}),
+    ('export_products_pdf', 'export-products-pdf', {}),
+    ('export_all_leaves_pdf', 'export-all-leaves-pdf', {}),
+]
+
+BENCHMARK_USER = 'benchmark_admin'
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile, which stays meaningful for small samples
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def consume(response):
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+class Command(BaseCommand):
+    help = 'Seed a throwaway test database at several sizes and time the dashboard views against it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000', help='Comma separated product counts to benchmark at')
+        parser.add_argument('--repeat', type=int, default=10, help='Timed requests per view and size')
+        parser.add_argument('--views', help='Comma separated labels to limit the run to')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        targets = TARGETS
+        if options['views']:
+            wanted = set(options['views'].split(','))
+            targets = [target for target in TARGETS if target[0] in wanted]
+
+        report = {
+            'started_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'seed': options['seed'],
+            'sizes': {},
+        }
+
+        # Never touch the real database: run against a fresh test database
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        scratch = tempfile.mkdtemp(prefix='benchmark-')
+        try:
+            with override_settings(
+                STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+                MEDIA_ROOT=scratch,
+                PDF_CACHE_DIR=scratch,
+                EXPORT_JOBS_IN_PROCESS=False,
+                QUERY_BUDGET_ENABLED=False,
+            ):
+                for size in sizes:
+                    self.stderr.write(f'Seeding {size} products...')
+                    report['sizes'][str(size)] = self.run_size(size, targets, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def run_size(self, size, targets, options):
+        flush_seed_data()
+        User.objects.filter(username=BENCHMARK_USER).delete()
+        call_command(
+            'seed_data',
+            users=max(10, size // 20),
+            products=size,
+            orders=size,
+            leaves=size // 2,
+            loans=size // 2,
+            seed=options['seed'],
+            stdout=self.stderr,
+        )
+
+        admin = User.objects.create_superuser(BENCHMARK_USER, 'benchmark@example.com', 'benchmark', is_staff=True)
+        for name in ['Admin', 'Finance', 'Leave Manager']:
+            admin.groups.add(Group.objects.get_or_create(name=name)[0])
+        client = Client()
+        client.force_login(admin)
+
+        results = {}
+        for label, url_name, kwargs in targets:
+            try:
+                url = reverse(url_name, kwargs=kwargs)
+            except NoReverseMatch:
+                results[label] = {'skipped': f'{url_name} is not routed'}
+                continue
+            results[label] = self.measure(client, url, options['repeat'])
+            self.stderr.write(f"  {label}: p50 {results[label]['p50_ms']} ms, {results[label]['queries']} queries")
+        return results
+
+    def measure(self, client, url, repeat):
+        # Warm caches, template loading and the connection first
+        cache.clear()
+        consume(client.get(url))
+
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = consume(client.get(url))
+            timings.append((time.perf_counter() - started) * 1000)
+
+        recorder = QueryRecorder()
+        with recorder.capture():
+            consume(client.get(url))
+
+        # Measured separately because tracemalloc slows everything down
+        tracemalloc.start()
+        try:
+            consume(client.get(url))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 0.5), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'mean_ms': round(statistics.mean(timings), 2),
+            'queries': recorder.count,
+            'repeated_queries': recorder.duplicate_count(),
+            'peak_kb': round(peak / 1024, 1),
+        }
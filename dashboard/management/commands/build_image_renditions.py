@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.images import generate_renditions
+from dashboard.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail, list and print renditions for existing product images'
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True).only('id', 'image')
+        count = 0
+        for product in products.iterator():
+            generate_renditions(product.image)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Processed images for {count} product(s)'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.schema import create_missing_indexes
+
+
+class Command(BaseCommand):
+    help = 'Add the model indexes (such as the keyset pagination ones) that existing tables are missing'
+
+    def handle(self, *args, **options):
+        created = create_missing_indexes()
+        for name in created:
+            self.stdout.write(f'Added index {name}')
+        self.stdout.write(self.style.SUCCESS(f'{len(created)} indexes added'))
@@ -0,0 +1,51 @@
+import os
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.imports import DEFAULT_BATCH_SIZE, ImportFileError, import_job_orders
+
+
+class Command(BaseCommand):
+    help = 'Create job orders in bulk from a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file with one job order per row')
+        parser.add_argument('--user', help='Username recorded as the creator of the imported job orders')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Validate every row without writing anything')
+        parser.add_argument('--report', help='Write the per-row error report to this CSV file')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"No user named {options['user']}")
+
+        try:
+            with open(options['path'], 'rb') as handle:
+                result = import_job_orders(
+                    handle, os.path.basename(options['path']), user=user,
+                    batch_size=options['batch_size'], dry_run=options['dry_run'],
+                )
+        except (OSError, ImportFileError) as error:
+            raise CommandError(str(error))
+
+        for error in result.errors[:20]:
+            self.stderr.write(f'Row {error.row} {error.field}: {error.message}')
+        if len(result.errors) > 20:
+            self.stderr.write(f'... and {len(result.errors) - 20} more')
+
+        if options['report'] and result.errors:
+            with open(options['report'], 'w', newline='') as handle:
+                handle.writelines(result.report_lines())
+            self.stderr.write(f"Wrote the error report to {options['report']}")
+
+        if options['dry_run']:
+            done = f'{result.valid} job orders would be created'
+        else:
+            done = f'{result.created} job orders created'
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.rows} rows read, {done}, {result.failed_rows} rows rejected'
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from dashboard.models import ProductStatusHistory
+from dashboard.timeline import normalize_current
+
+
+class Command(BaseCommand):
+    help = 'Keep only the newest production status of each job order flagged as current, then enforce it'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            retired = normalize_current()
+        self.stdout.write(f'Cleared the current flag on {retired} older status entries')
+
+        # Tables created before the constraint existed never got it
+        table = ProductStatusHistory._meta.db_table
+        with connection.cursor() as cursor:
+            existing = connection.introspection.get_constraints(cursor, table)
+        for constraint in ProductStatusHistory._meta.constraints:
+            if constraint.name not in existing:
+                with connection.schema_editor() as editor:
+                    editor.add_constraint(ProductStatusHistory, constraint)
+                self.stdout.write(f'Added constraint {constraint.name}')
+        self.stdout.write(self.style.SUCCESS('Status history normalized'))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.export_jobs import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Render pending background exports and store them under MEDIA_ROOT/exports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help='Maximum number of jobs to process per pass')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new jobs instead of exiting')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to wait between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = run_pending_jobs(limit=options['limit'])
+            if processed:
+                self.stdout.write(self.style.SUCCESS(f'Processed {processed} export job(s)'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
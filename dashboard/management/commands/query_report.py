@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Avg, Count, Max, Q
+from django.utils import timezone
+
+from dashboard.models import QueryReport
+
+
+class Command(BaseCommand):
+    help = 'Summarise recorded query counts and timings per view'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24, help='Only include requests from the last N hours')
+        parser.add_argument('--view', help='Only include this URL name')
+        parser.add_argument('--over-budget', action='store_true', help='Only list views that went over their budget')
+        parser.add_argument('--fail', action='store_true', help='Exit with an error if any view went over its budget')
+        parser.add_argument('--clear', action='store_true', help='Delete the recorded requests instead of reporting')
+
+    def handle(self, *args, **options):
+        reports = QueryReport.objects.filter(created_at__gte=timezone.now() - timedelta(hours=options['hours']))
+        if options['view']:
+            reports = reports.filter(view_name=options['view'])
+
+        if options['clear']:
+            deleted, _ = reports.delete()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} query report(s)'))
+            return
+
+        rows = reports.values('view_name')\
+            .annotate(
+                requests=Count('id'),
+                avg_queries=Avg('query_count'),
+                max_queries=Max('query_count'),
+                avg_duplicates=Avg('duplicate_count'),
+                avg_sql_ms=Avg('sql_ms'),
+                avg_total_ms=Avg('total_ms'),
+                budget=Max('budget'),
+                over=Count('id', filter=Q(over_budget=True)),
+            )\
+            .order_by('-max_queries')
+        if options['over_budget']:
+            rows = rows.filter(over__gt=0)
+
+        self.stdout.write(
+            f"{'view':40} {'reqs':>6} {'avg q':>7} {'max q':>6} {'dup':>6} "
+            f"{'sql ms':>8} {'total ms':>9} {'budget':>6} {'over':>5}"
+        )
+        offenders = 0
+        for row in rows:
+            offenders += bool(row['over'])
+            line = (
+                f"{row['view_name'][:40]:40} {row['requests']:>6} {row['avg_queries']:>7.1f} "
+                f"{row['max_queries']:>6} {row['avg_duplicates']:>6.1f} {row['avg_sql_ms']:>8.1f} "
+                f"{row['avg_total_ms']:>9.1f} {row['budget']:>6} {row['over']:>5}"
+            )
+            self.stdout.write(self.style.WARNING(line) if row['over'] else line)
+
+            if row['over'] and options['verbosity'] > 1:
+                worst = reports.filter(view_name=row['view_name']).order_by('-query_count').first()
+                for item in worst.duplicates:
+                    self.stdout.write(f"    {item['count']}x {item['fingerprint'][:160]}")
+
+        if options['fail'] and offenders:
+            raise CommandError(f'{offenders} view(s) went over their query budget')
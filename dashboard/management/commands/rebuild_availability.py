@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.availability import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recreate the per-day staff absence rows from the approved leaves'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Leaves rewritten per transaction')
+
+    def handle(self, *args, **options):
+        written = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} absence day(s)'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.search import SEARCH_INDEXES, create_search_tables
+
+
+class Command(BaseCommand):
+    help = 'Recreate the full-text search rows for products, leaves and loans'
+
+    def handle(self, *args, **options):
+        if not create_search_tables(rebuild=True):
+            raise CommandError('Full-text search needs SQLite with FTS5; views fall back to icontains')
+        for model, index in SEARCH_INDEXES.items():
+            self.stdout.write(f"{index['table']}: {model.objects.count()} rows")
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
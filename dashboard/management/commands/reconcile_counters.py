@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.counters import count_all, get_counters, reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recount the dashboard card totals from the source tables and fix any drift'
+
+    def handle(self, *args, **options):
+        stored = get_counters()
+        actual = count_all()
+        for name, value in actual.items():
+            if getattr(stored, name) != value:
+                self.stdout.write(f'{name}: {getattr(stored, name)} -> {value}')
+        reconcile()
+        self.stdout.write(self.style.SUCCESS('Dashboard counters reconciled'))
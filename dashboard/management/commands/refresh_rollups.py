@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.rollups import SOURCES, refresh_rollups
+
+
+class Command(BaseCommand):
+    help = 'Update the daily leave and loan rollups for the days that changed since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=sorted(SOURCES), action='append', help='Only refresh these rollups (repeatable)')
+        parser.add_argument('--rebuild', action='store_true', help='Recompute every day instead of only the changed ones')
+        parser.add_argument('--loop', action='store_true', help='Keep refreshing instead of exiting')
+        parser.add_argument('--interval', type=float, default=300.0, help='Seconds to wait between refreshes with --loop')
+
+    def handle(self, *args, **options):
+        kinds = options['kind'] or sorted(SOURCES)
+        rebuild = options['rebuild']
+        while True:
+            for kind in kinds:
+                days = refresh_rollups(kind, rebuild=rebuild)
+                if days or rebuild:
+                    self.stdout.write(self.style.SUCCESS(f'{kind}: recomputed {days} day(s)'))
+            if not options['loop']:
+                break
+            rebuild = False
+            time.sleep(options['interval'])
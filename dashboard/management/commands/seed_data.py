@@ -0,0 +1,181 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User, Group
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard.availability import rebuild as rebuild_availability
+from dashboard.counters import CUSTOMER_GROUP_ID, reconcile
+from dashboard.models import (
+    Product, ProductStatusHistory, Order, Leave, Loan, Profile,
+    CATEGORY, DEPARTMENT_CHOICES,
+)
+from dashboard.rollups import day_of, mark_changed
+from dashboard.search import create_search_tables
+
+
+# Everything this command creates is tagged with these prefixes so it can
+# be removed again without touching real data
+USER_PREFIX = 'seed_'
+JOB_ORDER_PREFIX = 'SEED-'
+
+STATUSES = ['Pending', 'Approved', 'Rejected']
+PRODUCTION_STATUSES = ['Design', 'Printing', 'Lamination', 'Slitting', 'Bag Making', 'Packed']
+ORDER_STATUSES = ['pending', 'processing', 'shipped', 'delivered', 'cancelled']
+
+
+def flush_seed_data():
+    Product.objects.filter(job_order__startswith=JOB_ORDER_PREFIX).delete()
+    User.objects.filter(username__startswith=USER_PREFIX).delete()
+
+
+def _spread(rng, days):
+    return timezone.now() - timedelta(days=rng.uniform(0, days), seconds=rng.randint(0, 86399))
+
+
+class Command(BaseCommand):
+    help = 'Create reproducible synthetic users, job orders, orders, leaves and loans for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--history', type=int, default=3, help='Status history rows per product')
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--leaves', type=int, default=500)
+        parser.add_argument('--loans', type=int, default=500)
+        parser.add_argument('--days', type=int, default=365, help='Spread dates over this many past days')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, so runs are repeatable')
+        parser.add_argument('--flush', action='store_true', help='Remove previously seeded data first')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        days = options['days']
+        batch = 1000
+
+        if options['flush']:
+            flush_seed_data()
+
+        with transaction.atomic():
+            customers, _ = Group.objects.get_or_create(id=CUSTOMER_GROUP_ID, defaults={'name': 'Customer'})
+            start = User.objects.filter(username__startswith=USER_PREFIX).count()
+
+            User.objects.bulk_create([
+                User(username=f'{USER_PREFIX}{start + n}', email=f'{USER_PREFIX}{start + n}@example.com',
+                     first_name='Seed', last_name=str(start + n))
+                for n in range(options['users'])
+            ], batch_size=batch)
+            users = list(User.objects.filter(username__startswith=USER_PREFIX).order_by('id'))
+            with_profile = set(Profile.objects.filter(user__in=users).values_list('user_id', flat=True))
+            Profile.objects.bulk_create([
+                Profile(user=user, department=rng.choice(DEPARTMENT_CHOICES)[0])
+                for user in users if user.id not in with_profile
+            ], batch_size=batch)
+            customers.user_set.add(*rng.sample(users, k=max(1, len(users) // 2)))
+
+            offset = Product.objects.filter(job_order__startswith=JOB_ORDER_PREFIX).count()
+            products = []
+            histories = []
+            for n in range(options['products']):
+                # The product shows the status of its newest history row
+                statuses = [rng.choice(PRODUCTION_STATUSES) for _ in range(options['history'])]
+                histories.append(statuses)
+                price = Decimal(rng.randint(100, 50000)) / 100
+                quantity = rng.randint(1, 5000)
+                products.append(Product(
+                    name=f'Seed product {offset + n}',
+                    category=rng.choice(CATEGORY)[0],
+                    job_order=f'{JOB_ORDER_PREFIX}{offset + n:07d}',
+                    organization_name=f'Organisation {rng.randint(1, 300)}',
+                    address='1 Seed Street',
+                    contact_number='08000000000',
+                    print_product=rng.choice(['Bag', 'Roll', 'Pouch', 'Label']),
+                    colors=str(rng.randint(1, 8)),
+                    job_title=f'Job {offset + n}',
+                    price=price,
+                    quantity=quantity,
+                    order_quantity=quantity,
+                    total=price * quantity,
+                    date_created=_spread(rng, days),
+                    production_status=statuses[-1] if statuses else rng.choice(PRODUCTION_STATUSES),
+                    approval_status=rng.choice(['pending', 'approved', 'rejected']),
+                    created_by=rng.choice(users),
+                ))
+            products = Product.objects.bulk_create(products, batch_size=batch)
+
+            history = ProductStatusHistory.objects.bulk_create([
+                ProductStatusHistory(
+                    product=product,
+                    status=status,
+                    updated_by=rng.choice(users),
+                    is_active=(n == len(statuses) - 1),
+                )
+                for product, statuses in zip(products, histories)
+                for n, status in enumerate(statuses)
+            ], batch_size=batch)
+
+            # production_status_date is auto_now, so copy it from the current
+            # history row afterwards
+            current = [row for row in history if row.is_active]
+            for row in current:
+                row.product.production_status_date = row.created_at
+            Product.objects.bulk_update([row.product for row in current], ['production_status_date'], batch_size=500)
+
+            orders = []
+            for _ in range(options['orders'] if products else 0):
+                product = rng.choice(products)
+                order_quantity = rng.randint(1, 500)
+                orders.append(Order(
+                    product=product,
+                    customer=rng.choice(users),
+                    order_quantity=order_quantity,
+                    total_price=product.price * order_quantity,
+                    date_created=_spread(rng, days),
+                    estimated_delivery_date=(timezone.now() + timedelta(days=rng.randint(-30, 60))).date(),
+                    order_status=rng.choice(ORDER_STATUSES),
+                ))
+            Order.objects.bulk_create(orders, batch_size=batch)
+
+            leaves = self.requests(Leave, 'leave_type', Leave.LEAVE_TYPES, options['leaves'], users, rng, days)
+            loans = self.requests(Loan, 'loan_type', Loan.LOAN_TYPES, options['loans'], users, rng, days,
+                                  amount=lambda: Decimal(rng.randint(10000, 5000000)) / 100)
+
+        # bulk_create skips the signals that keep these in sync
+        reconcile()
+        rebuild_availability()
+        create_search_tables(rebuild=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['users']} users, {len(products)} products, {len(orders)} orders, "
+            f"{leaves} leaves and {loans} loans"
+        ))
+
+    def requests(self, model, type_field, types, count, users, rng, days, **extra):
+        objects = []
+        for _ in range(count):
+            start = (timezone.now() + timedelta(days=rng.randint(-days, 30))).date()
+            status = rng.choice(STATUSES)
+            applied = _spread(rng, days)
+            obj = model(
+                user=rng.choice(users),
+                start_date=start,
+                end_date=start + timedelta(days=rng.randint(0, 14)),
+                reason='Seeded request',
+                status=status,
+                approved_by=rng.choice(users) if status != 'Pending' else None,
+                response_date=applied + timedelta(hours=rng.randint(1, 240)) if status != 'Pending' else None,
+                **{type_field: rng.choice(types)[0]},
+                **{name: make() for name, make in extra.items()},
+            )
+            obj._applied = applied
+            objects.append(obj)
+        objects = model.objects.bulk_create(objects, batch_size=1000)
+
+        # applied_date is auto_now_add, so spread it out afterwards
+        for obj in objects:
+            obj.applied_date = obj._applied
+        model.objects.bulk_update(objects, ['applied_date'], batch_size=500)
+        mark_changed(model, [day_of(obj.applied_date) for obj in objects])
+        return len(objects)
@@ -1,6 +1,8 @@
-import random
-import string
-from django.db import models
+import re
+
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.contrib.humanize.templatetags.humanize import intcomma
@@ -36,22 +38,93 @@ class Profile(models.Model):
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
-def generate_submission_id():
-    chars = string.ascii_uppercase + string.digits
-    return ''.join(random.choice(chars) for _ in range(10))
+class Sequence(models.Model):
+    # Named counters behind job order and submission numbers
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
 
-def generate_job_order():
-    prefix = 'JO'
-    random_number = random.randint(1000, 9999)
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    @classmethod
+    def allocate(cls, name, count=1, start=None):
+        """
+        Reserve `count` consecutive numbers from the named sequence and
+        return the first one. `start` is called once, when the sequence is
+        first used, to say where existing data leaves off.
+        """
+        with transaction.atomic():
+            # The UPDATE takes the write lock before the value is read back,
+            # so concurrent callers queue on it instead of racing
+            updated = cls.objects.filter(name=name).update(value=F('value') + count)
+            if not updated:
+                cls.objects.get_or_create(name=name, defaults={'value': start() if start else 0})
+                cls.objects.filter(name=name).update(value=F('value') + count)
+            value = cls.objects.filter(name=name).values_list('value', flat=True).get()
+        return value - count + 1
+
+    @classmethod
+    def advance(cls, name, value, start=None):
+        # Make sure the next number handed out is above `value`
+        with transaction.atomic():
+            if not cls.objects.filter(name=name).update(value=Greatest(F('value'), value)):
+                cls.objects.get_or_create(name=name, defaults={'value': max(start() if start else 0, value)})
+                cls.objects.filter(name=name).update(value=Greatest(F('value'), value))
+
+
+JOB_ORDER_PATTERN = re.compile(r'^JO-(\d+)-(\d{2})$')
+
+
+def _highest_job_order(year):
+    # Job orders used to be JO-<random 1000-9999>-YY; carry on above them
+    highest = 0
+    for job_order in Product.objects.filter(job_order__startswith='JO-', job_order__endswith=f'-{year}')\
+            .values_list('job_order', flat=True).iterator():
+        number = job_order[3:-len(year) - 1]
+        if number.isdigit():
+            highest = max(highest, int(number))
+    return highest
+
+def format_job_order(number, year):
+    return f"JO-{number:04d}-{year}"
+
+def reserve_job_orders(job_orders):
+    """
+    Push the job order sequences past explicitly chosen numbers, so
+    generated ones never collide with them.
+    """
+    highest = {}
+    for job_order in job_orders:
+        match = JOB_ORDER_PATTERN.match(job_order or '')
+        if match:
+            number, year = int(match.group(1)), match.group(2)
+            highest[year] = max(highest.get(year, 0), number)
+    for year, number in highest.items():
+        Sequence.advance(f'job_order-{year}', number, start=lambda: _highest_job_order(year))
+
+def generate_job_orders(count):
     year = timezone.now().strftime('%y')
-    return f"{prefix}-{random_number}-{year}"
+    first = Sequence.allocate(f'job_order-{year}', count, start=lambda: _highest_job_order(year))
+    return [format_job_order(number, year) for number in range(first, first + count)]
+
+def generate_job_order():
+    return generate_job_orders(1)[0]
+
+def generate_submission_ids(count):
+    # The dash keeps these apart from the old random 10 character ids
+    first = Sequence.allocate('submission_id', count)
+    return [f"SUB-{number:08d}" for number in range(first, first + count)]
+
+def generate_submission_id():
+    return generate_submission_ids(1)[0]
 
 class Product(models.Model):
     # Basic Information
     name = models.CharField(max_length=100, null=True)
     category = models.CharField(choices=CATEGORY, max_length=50, null=True)
-    job_order = models.CharField(max_length=50, unique=True, default=generate_job_order)
-    submission_id = models.CharField(max_length=50, null=True, blank=True, default=generate_submission_id)
+    # Both are allocated in save() when left blank
+    job_order = models.CharField(max_length=50, unique=True, blank=True)
+    submission_id = models.CharField(max_length=50, null=True, blank=True, db_index=True)
     
     # Customer Information
     organization_name = models.CharField(max_length=200, null=True, blank=True)
@@ -106,6 +179,10 @@ class Product(models.Model):
             ("can_export_products", "Can export products"),
             ("can_export_leaves", "Can export leaves"),
         ]
+        indexes = [
+            # Keyset pagination walks this index in both directions
+            models.Index(fields=['date_created', 'id']),
+        ]
         
         
         
@@ -134,6 +211,9 @@ class Product(models.Model):
             self.submission_id = generate_submission_id()
         if not self.job_order:
             self.job_order = generate_job_order()
+        elif self._state.adding:
+            # Keep the sequence past numbers given by hand to new products
+            reserve_job_orders([self.job_order])
         self.calculate_total()
         self.calculate_cycle_time()
         super().save(*args, **kwargs)
@@ -174,20 +254,22 @@ class ProductStatusHistory(models.Model):
         verbose_name_plural = 'Production Status Histories'
         indexes = [
             models.Index(fields=['created_at', 'is_active']),
+            # A product's timeline in order, and its current entry
+            models.Index(fields=['product', 'created_at']),
+        ]
+        constraints = [
+            # Only the newest entry of a product is current; rows saved
+            # before dashboard.timeline existed are fixed up by
+            # `manage.py normalize_status_history`
+            models.UniqueConstraint(fields=['product'], condition=models.Q(is_active=True), name='status_history_current'),
         ]
         
         
     def __str__(self):
         return f"Status update for {self.product.job_order} at {self.created_at}"
     
-    def save(self, *args, **kwargs):
-        # Update the parent product's status
-        if self.is_active:
-            self.product.production_status = self.status
-            self.product.production_status_date = self.created_at
-            self.product.updated_by = self.updated_by
-            self.product.save()
-        super().save(*args, **kwargs)
+    # Rows are written through dashboard.timeline, which also keeps the
+    # product's current status in step
         
         
 
@@ -225,6 +307,11 @@ class Order(models.Model):
 
     def can_be_cancelled(self):
         return self.order_status in ['pending', 'processing']
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date_created', 'id']),
+        ]
     
     
 
@@ -307,7 +394,7 @@ class Leave(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=['status']),
-            models.Index(fields=['applied_date']),
+            models.Index(fields=['applied_date', 'id']),
             models.Index(fields=['user']),
         ]
     
@@ -374,13 +461,136 @@ class Loan(models.Model):
         ordering = ['id']
         indexes = [
             models.Index(fields=['status']),
-            models.Index(fields=['applied_date']),
+            models.Index(fields=['applied_date', 'id']),
             models.Index(fields=['user']),
         ]
 
 
 
 
+class ExportJob(models.Model):
+    STATUS = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    dedupe_key = models.CharField(max_length=64, db_index=True)
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs')
+    status = models.CharField(max_length=10, choices=STATUS, default='pending')
+    file = models.FileField(upload_to='exports/', null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        constraints = [
+            # At most one pending or running job per identical request
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='export_job_active_dedupe',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} export #{self.id} - {self.status}"
+
+    def is_finished(self):
+        return self.status in ['done', 'failed']
+
+
+
+
+class DashboardCounters(models.Model):
+    # Single row of running totals for the dashboard cards, kept current
+    # by signals and corrected by the reconcile_counters command
+    products = models.IntegerField(default=0)
+    orders = models.IntegerField(default=0)
+    customers = models.IntegerField(default=0)
+    leaves = models.IntegerField(default=0)
+    pending_leaves = models.IntegerField(default=0)
+    loans = models.IntegerField(default=0)
+    pending_loans = models.IntegerField(default=0)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Dashboard Counters'
+        verbose_name_plural = 'Dashboard Counters'
+
+    def __str__(self):
+        return f"Dashboard counters (reconciled {self.reconciled_at})"
+
+
+
+
+class QueryReport(models.Model):
+    # One request as seen by QueryBudgetMiddleware
+    view_name = models.CharField(max_length=200, db_index=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status_code = models.PositiveIntegerField()
+    query_count = models.PositiveIntegerField()
+    duplicate_count = models.PositiveIntegerField(default=0)
+    sql_ms = models.FloatField()
+    total_ms = models.FloatField()
+    budget = models.PositiveIntegerField()
+    over_budget = models.BooleanField(default=False)
+    duplicates = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.view_name}: {self.query_count} queries"
+
+
+
+
+class OutboxEmail(models.Model):
+    # Written in the same transaction as the change it reports on, then
+    # sent by dashboard.outbox.drain_outbox
+    STATUS = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, null=True, blank=True)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    # When a pending email is next due, or when a claimed one may be retried
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim = models.CharField(max_length=32, null=True, blank=True, db_index=True)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.to)} - {self.status}"
+
+
+
+
 
 
 # Define custom permission groups
@@ -451,3 +661,82 @@ def create_permission_groups():
 
 
 
+
+
+
+
+class DailyRollup(models.Model):
+    # Leave or loan requests applied for on one day, totalled per
+    # department, type and status. Maintained by dashboard.rollups from
+    # the RollupChange log, so trend charts read a row per group and day
+    # instead of scanning the requests themselves
+    KINDS = (
+        ('leave', 'Leave'),
+        ('loan', 'Loan'),
+    )
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    day = models.DateField()
+    department = models.CharField(max_length=100, blank=True, default='')
+    request_type = models.CharField(max_length=20)
+    status = models.CharField(max_length=10)
+    count = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Requests with a response, and the total seconds they waited for it
+    responded = models.PositiveIntegerField(default=0)
+    response_seconds = models.FloatField(default=0)
+
+    class Meta:
+        ordering = ['kind', 'day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'day', 'department', 'request_type', 'status'],
+                name='daily_rollup_group',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.day} {self.department} {self.request_type} {self.status}: {self.count}"
+
+
+class RollupChange(models.Model):
+    # A day whose rollups are out of date, appended whenever a leave or
+    # loan is saved or deleted
+    kind = models.CharField(max_length=10, choices=DailyRollup.KINDS)
+    day = models.DateField()
+
+
+class RollupState(models.Model):
+    # High-water mark: the newest RollupChange applied by the last refresh
+    kind = models.CharField(max_length=10, choices=DailyRollup.KINDS, unique=True)
+    high_water = models.BigIntegerField(default=0)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} rollups up to change {self.high_water}"
+
+
+
+
+class StaffAbsence(models.Model):
+    # One row per day an approved leave keeps someone away, kept in step
+    # with Leave by dashboard.availability. "Who is out on D" is then an
+    # index lookup on day instead of a date range scan over every leave
+    leave = models.ForeignKey(Leave, on_delete=models.CASCADE, related_name='absence_days')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='absence_days')
+    day = models.DateField()
+    department = models.CharField(max_length=100, blank=True, default='')
+    leave_type = models.CharField(max_length=20)
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['leave', 'day'], name='staff_absence_leave_day'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'department']),
+            models.Index(fields=['user', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} out on {self.day} ({self.leave_type})"
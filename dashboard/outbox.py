@@ -0,0 +1,180 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def queue_email(subject, body, to, from_email=None):
+    """
+    Record an email to be sent once the surrounding transaction commits.
+    Call it inside the same atomic block as the change it reports on, so
+    a rolled back change never sends and a committed one always does.
+    """
+    emails = queue_emails([(subject, body, to)], from_email=from_email)
+    return emails[0] if emails else None
+
+
+def queue_emails(messages, from_email=None):
+    # Many (subject, body, to) emails with one INSERT
+    from_email = from_email or settings.EMAIL_HOST_USER
+    emails = []
+    for subject, body, to in messages:
+        recipients = [address for address in to if address]
+        if recipients:
+            emails.append(OutboxEmail(subject=subject, body=body, from_email=from_email, to=recipients))
+    if not emails:
+        return []
+    emails = OutboxEmail.objects.bulk_create(emails)
+    if _setting('EMAIL_OUTBOX_IN_PROCESS', True):
+        transaction.on_commit(lambda: _get_executor().submit(_dispatch_in_thread))
+    return emails
+
+
+_executor = None
+_wakeup = None
+_wakeup_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # One worker, so in-process dispatches never race each other
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='email-outbox')
+    return _executor
+
+
+def _dispatch_in_thread():
+    try:
+        drain_outbox()
+        schedule_wakeup()
+    except Exception:
+        logger.exception("Email outbox dispatch failed")
+    finally:
+        close_old_connections()
+
+
+def schedule_wakeup():
+    """
+    Arrange an in-process dispatch for when the earliest waiting email
+    falls due, so retries go out without anything new being queued.
+    """
+    global _wakeup
+    due = OutboxEmail.objects.filter(status__in=['pending', 'sending'])\
+        .order_by('next_attempt_at')\
+        .values_list('next_attempt_at', flat=True)\
+        .first()
+    if due is None:
+        return None
+    delay = max((due - timezone.now()).total_seconds(), 0)
+    with _wakeup_lock:
+        if _wakeup is not None and _wakeup.is_alive():
+            if _wakeup.due <= due:
+                return _wakeup
+            _wakeup.cancel()
+        _wakeup = threading.Timer(delay, lambda: _get_executor().submit(_dispatch_in_thread))
+        _wakeup.daemon = True
+        _wakeup.due = due
+        _wakeup.start()
+    return _wakeup
+
+
+def retry_delay(attempts):
+    # Doubles with every failed attempt, capped at an hour
+    base = _setting('EMAIL_OUTBOX_RETRY_SECONDS', 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 3600))
+
+
+def claim_batch(batch_size):
+    """
+    Take up to `batch_size` due emails for this worker. Claimed rows are
+    pushed into the future, so a crashed worker's batch is picked up again
+    once that lease runs out.
+    """
+    now = timezone.now()
+    due = OutboxEmail.objects.filter(
+        Q(status='pending') | Q(status='sending'),
+        next_attempt_at__lte=now,
+    )
+    ids = list(due.order_by('next_attempt_at', 'id').values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return []
+
+    claim = uuid.uuid4().hex
+    lease = timedelta(seconds=_setting('EMAIL_OUTBOX_LEASE_SECONDS', 300))
+    # Re-checking the due filter in the UPDATE means rows another worker
+    # claimed in the meantime are left alone
+    due.filter(id__in=ids).update(status='sending', claim=claim, next_attempt_at=now + lease)
+    return list(OutboxEmail.objects.filter(claim=claim, status='sending').order_by('id'))
+
+
+def drain_outbox(batch_size=None):
+    """
+    Send batch after batch until no due email is left, returning the
+    totals as (sent, failed).
+    """
+    sent = failed = 0
+    while True:
+        emails = claim_batch(batch_size or _setting('EMAIL_OUTBOX_BATCH_SIZE', 50))
+        if not emails:
+            return sent, failed
+        batch_sent, batch_failed = send_batch(emails)
+        sent += batch_sent
+        failed += batch_failed
+
+
+def send_batch(emails):
+    """
+    Send claimed emails over one mail connection, returning (sent, failed).
+    Failures are retried with exponential backoff until
+    EMAIL_OUTBOX_MAX_ATTEMPTS, after which they are marked failed.
+    """
+    max_attempts = _setting('EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    sent = failed = 0
+    if not emails:
+        return sent, failed
+
+    connection = get_connection(fail_silently=False)
+    try:
+        for email in emails:
+            email.attempts += 1
+            try:
+                # Opens the connection the first time, and again if a
+                # failure dropped it; otherwise it is reused
+                connection.open()
+                connection.send_messages([
+                    EmailMessage(email.subject, email.body, email.from_email, email.to, connection=connection)
+                ])
+            except Exception as e:
+                logger.warning(f"Sending outbox email {email.id} failed (attempt {email.attempts}): {e}")
+                email.last_error = str(e)
+                if email.attempts >= max_attempts:
+                    email.status = 'failed'
+                    failed += 1
+                else:
+                    email.status = 'pending'
+                    email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+                connection.close()
+            else:
+                email.status = 'sent'
+                email.sent_at = timezone.now()
+                sent += 1
+            email.claim = None
+            email.save(update_fields=['status', 'attempts', 'next_attempt_at', 'claim', 'last_error', 'sent_at'])
+    finally:
+        connection.close()
+    return sent, failed
@@ -0,0 +1,129 @@
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+CURSOR_SALT = 'dashboard.pagination.cursor'
+
+# Above this many rows the total is shown as "N+" instead of counted exactly
+ESTIMATE_CAP = 1000
+
+
+class CursorPage:
+    """
+    One page of a CursorPaginator. Iterates like a Django Page, but links to
+    its neighbours through opaque cursors instead of page numbers.
+    """
+
+    def __init__(self, paginator, object_list, next_cursor, previous_cursor):
+        self.paginator = paginator
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset pagination over `queryset` ordered by `ordering`, which must end
+    in a unique field such as '-id'. Each page costs one indexed range query
+    no matter how deep it is, and no COUNT(*) is run unless the total is
+    asked for.
+    """
+
+    def __init__(self, queryset, ordering=('-date_created', '-id'), per_page=10):
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.per_page = per_page
+
+    def _fields(self):
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def _encode(self, obj, direction):
+        values = [getattr(obj, name) for name, _ in self._fields()]
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+        return signing.dumps({'d': direction, 'v': values}, salt=CURSOR_SALT, compress=True)
+
+    def _decode(self, cursor):
+        try:
+            data = signing.loads(cursor, salt=CURSOR_SALT)
+            direction, raw_values = data['d'], data['v']
+        except (signing.BadSignature, KeyError, TypeError):
+            return None, None
+
+        fields = self._fields()
+        if direction not in ('next', 'prev') or len(raw_values) != len(fields):
+            return None, None
+
+        values = []
+        for (name, _), value in zip(fields, raw_values):
+            try:
+                value = self.queryset.model._meta.get_field(name).to_python(value)
+            except FieldDoesNotExist:
+                # Annotations such as a search rank are stored as plain JSON
+                pass
+            except ValidationError:
+                return None, None
+            values.append(value)
+        return direction, values
+
+    def _after(self, values, reverse):
+        # (a, b, c) > (x, y, z) spelled out so each column can have its own
+        # direction: a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self._fields(), values):
+            forwards = descending == reverse
+            condition |= equal & Q(**{f'{name}__{"gt" if forwards else "lt"}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def get_page(self, cursor=None):
+        direction, values = self._decode(cursor) if cursor else (None, None)
+        reverse = direction == 'prev'
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        if not rows:
+            return CursorPage(self, rows, None, None)
+
+        if reverse:
+            next_cursor = self._encode(rows[-1], 'next')
+            previous_cursor = self._encode(rows[0], 'prev') if has_more else None
+        else:
+            next_cursor = self._encode(rows[-1], 'next') if has_more else None
+            previous_cursor = self._encode(rows[0], 'prev') if values is not None else None
+        return CursorPage(self, rows, next_cursor, previous_cursor)
+
+    def estimated_total(self, cap=ESTIMATE_CAP):
+        """
+        Return (total, capped). Counting stops after `cap` rows, so this
+        stays cheap on large tables.
+        """
+        total = self.queryset.order_by()[:cap + 1].count()
+        return min(total, cap), total > cap
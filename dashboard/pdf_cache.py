@@ -0,0 +1,125 @@
+import contextlib
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.template.loader import get_template
+
+logger = logging.getLogger(__name__)
+
+
+# Bump when the ReportLab layout of a single job order changes
+SINGLE_PRODUCT_LAYOUT_VERSION = '2'
+
+
+def cache_dir():
+    return getattr(settings, 'PDF_CACHE_DIR', os.path.join(settings.BASE_DIR, 'pdf_cache'))
+
+
+def max_cache_bytes():
+    return getattr(settings, 'PDF_CACHE_MAX_BYTES', 200 * 1024 * 1024)
+
+
+@lru_cache(maxsize=None)
+def template_hash(template_name):
+    source = get_template(template_name).template.source
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def product_revision(product):
+    """
+    Everything about a product that can change what its PDF looks like.
+    The row itself is hashed whole, so updates that skip post_save (such as
+    queryset.update() or bulk_update()) still change the key.
+    """
+    history = product.status_history.aggregate(last_id=Max('id'), total=Count('id'))
+    fields = '|'.join(field.value_to_string(product) for field in product._meta.concrete_fields)
+    return [
+        product.id,
+        hashlib.sha256(fields.encode('utf-8')).hexdigest(),
+        history['last_id'],
+        history['total'],
+    ]
+
+
+def cache_key(kind, product, layout_hash):
+    payload = '|'.join(str(part) for part in [kind, layout_hash] + product_revision(product))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _product_dir(product_id):
+    return os.path.join(cache_dir(), str(product_id))
+
+
+def cached_product_pdf(kind, product, layout_hash, render):
+    """
+    Return the path of the rendered PDF for `product`, calling
+    `render(product, output)` only when no copy for this revision exists.
+    """
+    directory = _product_dir(product.id)
+    path = os.path.join(directory, f'{kind}-{cache_key(kind, product, layout_hash)}.pdf')
+
+    if os.path.exists(path):
+        # Touch on hit so eviction drops the least recently used files first
+        os.utime(path)
+        return path
+
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            render(product, output)
+        os.replace(tmp_path, path)
+    except Exception:
+        # invalidate_product may have removed the directory mid-render
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
+
+    evict()
+    return path
+
+
+def invalidate_product(product_id):
+    shutil.rmtree(_product_dir(product_id), ignore_errors=True)
+
+
+def evict(max_bytes=None):
+    """
+    Delete least recently used PDFs until the cache fits in `max_bytes`.
+    """
+    max_bytes = max_cache_bytes() if max_bytes is None else max_bytes
+    root = cache_dir()
+    if not os.path.isdir(root):
+        return 0
+
+    entries = []
+    total = 0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if not name.endswith('.pdf'):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
@@ -0,0 +1,147 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def budget_for(view_name):
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    return budgets.get(view_name, getattr(settings, 'QUERY_BUDGET_DEFAULT', 50))
+
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\bIN \((?:[^()]*)\)', re.IGNORECASE)
+
+
+def fingerprint(sql):
+    """
+    The shape of a statement, with literals and IN lists collapsed, so the
+    same query run for different rows is counted as a repeat.
+    """
+    sql = _LITERALS.sub('?', sql)
+    sql = _IN_LISTS.sub('IN (...)', sql)
+    return ' '.join(sql.split())
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, (time.perf_counter() - started) * 1000))
+
+    @contextmanager
+    def capture(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def sql_ms(self):
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self, limit=5):
+        counts = Counter(fingerprint(sql) for sql, _ in self.queries)
+        return [
+            {'fingerprint': sql, 'count': count}
+            for sql, count in counts.most_common(limit)
+            if count > 1
+        ]
+
+    def duplicate_count(self):
+        counts = Counter(fingerprint(sql) for sql, _ in self.queries)
+        return sum(count - 1 for count in counts.values())
+
+
+@contextmanager
+def query_budget(limit, label='block'):
+    """
+    Fail with QueryBudgetExceeded when the wrapped code runs more than
+    `limit` queries. Meant for tests guarding against N+1 regressions.
+    """
+    recorder = QueryRecorder()
+    with recorder.capture():
+        yield recorder
+    if recorder.count > limit:
+        repeats = '; '.join(f"{item['count']}x {item['fingerprint'][:120]}" for item in recorder.duplicates())
+        raise QueryBudgetExceeded(f"{label} ran {recorder.count} queries (budget {limit}). Repeated: {repeats or 'none'}")
+
+
+class QueryBudgetMiddleware:
+    """
+    Record query count, SQL time, repeated queries and total time for each
+    request as a QueryReport, warning about views over their budget.
+    Enabled with QUERY_BUDGET_ENABLED; with QUERY_BUDGET_RAISE the request
+    fails instead, which turns regressions into test failures.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with recorder.capture():
+            response = self.get_response(request)
+            # Render lazy template responses here so their queries count
+            if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+                response.render()
+        total_ms = (time.perf_counter() - started) * 1000
+
+        match = request.resolver_match
+        view_name = match.view_name if match else '(unresolved)'
+        budget = budget_for(view_name)
+        over_budget = recorder.count > budget
+
+        if over_budget:
+            logger.warning(
+                f"{view_name} ran {recorder.count} queries, over its budget of {budget} "
+                f"({recorder.duplicate_count()} repeated)"
+            )
+        self.store(request, response, view_name, recorder, total_ms, budget, over_budget)
+
+        if over_budget and getattr(settings, 'QUERY_BUDGET_RAISE', False):
+            raise QueryBudgetExceeded(f"{view_name} ran {recorder.count} queries (budget {budget})")
+        return response
+
+    def store(self, request, response, view_name, recorder, total_ms, budget, over_budget):
+        from .models import QueryReport
+
+        try:
+            QueryReport.objects.create(
+                view_name=view_name[:200],
+                method=request.method,
+                path=request.path[:500],
+                status_code=response.status_code,
+                query_count=recorder.count,
+                duplicate_count=recorder.duplicate_count(),
+                sql_ms=round(recorder.sql_ms, 2),
+                total_ms=round(total_ms, 2),
+                budget=budget,
+                over_budget=over_budget,
+                duplicates=recorder.duplicates(),
+            )
+        except Exception:
+            logger.exception("Could not store query report")
@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+
+def role_cache_seconds():
+    # 0 keeps the cache per request only. Only raise it with a cache shared
+    # by all workers, or group changes will not reach the other processes.
+    return getattr(settings, 'ROLE_CACHE_SECONDS', 0)
+
+
+class Roles:
+    """
+    The group names of one user, loaded once and then answered from memory.
+
+    Templates can test membership with `'Finance' in request.user.roles`.
+    """
+
+    def __init__(self, names):
+        self.names = frozenset(names)
+
+    def has_role(self, name):
+        return name in self.names
+
+    def has_any_role(self, *names):
+        return not self.names.isdisjoint(names)
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __iter__(self):
+        return iter(sorted(self.names))
+
+    def __bool__(self):
+        return bool(self.names)
+
+    def __repr__(self):
+        return f'<Roles {sorted(self.names)}>'
+
+
+def _version_keys(user_id):
+    return ['roles-version', f'roles-version:{user_id}']
+
+
+def invalidate_roles(user_ids=None):
+    """
+    Drop cached roles for the given users, or for everyone when a group
+    itself is renamed or deleted.
+    """
+    keys = ['roles-version'] if user_ids is None else [f'roles-version:{user_id}' for user_id in user_ids]
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def _load_names(user):
+    return list(user.groups.values_list('name', flat=True))
+
+
+def resolve_roles(user):
+    if not user.is_authenticated:
+        return Roles([])
+
+    seconds = role_cache_seconds()
+    if not seconds:
+        return Roles(_load_names(user))
+
+    versions = cache.get_many(_version_keys(user.pk))
+    key = 'roles:{}:{}:{}'.format(user.pk, *[versions.get(name, 0) for name in _version_keys(user.pk)])
+    names = cache.get(key)
+    if names is None:
+        names = _load_names(user)
+        cache.set(key, names, seconds)
+    return Roles(names)
+
+
+def get_roles(user):
+    """
+    Roles for `user`, resolved at most once per user object. RoleMiddleware
+    exposes the same object as `request.user.roles`.
+    """
+    roles = getattr(user, '_roles_cache', None)
+    if roles is None:
+        roles = resolve_roles(user)
+        user._roles_cache = roles
+    return roles
+
+
+class RoleMiddleware:
+    """
+    Attach a lazily resolved `roles` to `request.user`. Must come after
+    AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user = request.user
+        request.user.roles = SimpleLazyObject(lambda: get_roles(user))
+        return self.get_response(request)
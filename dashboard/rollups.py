@@ -0,0 +1,186 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyRollup, Leave, Loan, RollupChange, RollupState
+from .stats import RESPONDED, RESPONSE_TIME
+
+
+# kind: (model, type field, amount field)
+SOURCES = {
+    'leave': (Leave, 'leave_type', None),
+    'loan': (Loan, 'loan_type', 'amount'),
+}
+
+KINDS = {model: kind for kind, (model, _, _) in SOURCES.items()}
+
+# Days recomputed per query, keeping the IN list short
+DAYS_PER_BATCH = 100
+CHANGES_PER_DELETE = 500
+
+
+def day_of(value):
+    # The local calendar day, matching TruncDate in the current time zone
+    if timezone.is_aware(value):
+        return timezone.localdate(value)
+    return value.date()
+
+
+def start_of(day):
+    value = datetime.combine(day, time.min)
+    return timezone.make_aware(value) if settings.USE_TZ else value
+
+
+def mark_changed(model, days):
+    """
+    Log that the rollups for `days` no longer match `model`'s rows. Runs
+    in the caller's transaction, so the log entry is visible exactly when
+    the change it describes is.
+    """
+    days = {day for day in days if day}
+    RollupChange.objects.bulk_create([
+        RollupChange(kind=KINDS[model], day=day)
+        for day in days
+    ])
+
+
+def aggregate_days(kind, days):
+    # One GROUP BY over the requests applied for on `days`
+    model, type_field, amount_field = SOURCES[kind]
+    totals = {
+        'count': Count('id'),
+        'responded': Count('id', filter=RESPONDED),
+        'response_time': Sum(RESPONSE_TIME, filter=RESPONDED),
+    }
+    if amount_field:
+        totals['amount'] = Sum(amount_field)
+
+    rows = model.objects.filter(
+        applied_date__gte=start_of(min(days)),
+        applied_date__lt=start_of(max(days) + timedelta(days=1)),
+    ).annotate(day=TruncDate('applied_date')).filter(day__in=days)\
+        .order_by()\
+        .values('day', 'user__dashboard_profile__department', type_field, 'status')\
+        .annotate(**totals)
+
+    return [
+        DailyRollup(
+            kind=kind,
+            day=row['day'],
+            department=row['user__dashboard_profile__department'] or '',
+            request_type=row[type_field],
+            status=row['status'],
+            count=row['count'],
+            amount=row.get('amount') or 0,
+            responded=row['responded'],
+            response_seconds=row['response_time'].total_seconds() if row['response_time'] else 0,
+        )
+        for row in rows
+    ]
+
+
+def refresh_days(kind, days):
+    """
+    Recompute the rollups of `days` from the requests, replacing whatever
+    was stored for them. Safe to repeat.
+    """
+    days = sorted(days)
+    for i in range(0, len(days), DAYS_PER_BATCH):
+        batch = days[i:i + DAYS_PER_BATCH]
+        with transaction.atomic():
+            DailyRollup.objects.filter(kind=kind, day__in=batch).delete()
+            DailyRollup.objects.bulk_create(aggregate_days(kind, batch))
+    return len(days)
+
+
+def all_days(kind):
+    model = SOURCES[kind][0]
+    days = model.objects.annotate(day=TruncDate('applied_date'))\
+        .order_by()\
+        .values_list('day', flat=True)\
+        .distinct()
+    return set(days)
+
+
+def refresh_rollups(kind, rebuild=False):
+    """
+    Bring the `kind` rollups up to date and return how many days were
+    recomputed. Only days logged in RollupChange are touched; the first
+    run, or `rebuild`, recomputes every day instead.
+    """
+    state, _ = RollupState.objects.get_or_create(kind=kind)
+    # Only the changes read here are deleted afterwards, so one committed
+    # while the days are recomputed is left for the next run
+    collected = list(RollupChange.objects.filter(kind=kind).values_list('id', 'day'))
+    change_ids = [pk for pk, _ in collected]
+
+    if rebuild or state.refreshed_at is None:
+        # Stored days without requests any more are recomputed to nothing
+        stored = DailyRollup.objects.filter(kind=kind).values_list('day', flat=True).distinct()
+        days = all_days(kind) | set(stored)
+    else:
+        days = {day for _, day in collected}
+
+    refreshed = refresh_days(kind, days) if days else 0
+
+    RollupState.objects.filter(id=state.id).update(
+        high_water=max(change_ids, default=state.high_water),
+        refreshed_at=timezone.now(),
+    )
+    for i in range(0, len(change_ids), CHANGES_PER_DELETE):
+        RollupChange.objects.filter(id__in=change_ids[i:i + CHANGES_PER_DELETE]).delete()
+    return refreshed
+
+
+def user_changed(user_id):
+    """
+    Log every day the user has requests on, for when their department
+    changes and their rows move to another department's rollups.
+    """
+    for model, kind in KINDS.items():
+        days = model.objects.filter(user_id=user_id)\
+            .annotate(day=TruncDate('applied_date'))\
+            .order_by()\
+            .values_list('day', flat=True)\
+            .distinct()
+        mark_changed(model, days)
+
+
+def daily_trend(kind, days=None, today=None):
+    """
+    Per-day request totals for the last `days` days, oldest first, read
+    from the rollups. Days without requests are included as zeros.
+    """
+    days = days or getattr(settings, 'ROLLUP_TREND_DAYS', 30)
+    today = today or timezone.localdate()
+    start = today - timedelta(days=days - 1)
+
+    rows = DailyRollup.objects.filter(kind=kind, day__gte=start, day__lte=today)\
+        .order_by()\
+        .values('day')\
+        .annotate(
+            total=Sum('count'),
+            pending=Sum('count', filter=Q(status='Pending')),
+            approved=Sum('count', filter=Q(status='Approved')),
+            rejected=Sum('count', filter=Q(status='Rejected')),
+            amount=Sum('amount'),
+        )
+    by_day = {row['day']: row for row in rows}
+
+    trend = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = by_day.get(day, {})
+        trend.append({
+            'day': day.isoformat(),
+            'total': row.get('total') or 0,
+            'pending': row.get('pending') or 0,
+            'approved': row.get('approved') or 0,
+            'rejected': row.get('rejected') or 0,
+            'amount': float(row.get('amount') or 0),
+        })
+    return trend
@@ -0,0 +1,27 @@
+from django.apps import apps
+from django.db import connection
+
+
+def missing_indexes(model):
+    # Meta.indexes the table does not have yet
+    with connection.cursor() as cursor:
+        existing = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return [index for index in model._meta.indexes if index.name not in existing]
+
+
+def create_missing_indexes(app_label='dashboard'):
+    """
+    Add the Meta.indexes of the app's models that the database lacks.
+    The app ships no migrations, so tables created before an index was
+    declared never get it otherwise. Returns the names of those created.
+    """
+    tables = set(connection.introspection.table_names())
+    created = []
+    for model in apps.get_app_config(app_label).get_models():
+        if model._meta.db_table not in tables:
+            continue
+        for index in missing_indexes(model):
+            with connection.schema_editor() as editor:
+                editor.add_index(model, index)
+            created.append(index.name)
+    return created
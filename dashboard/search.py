@@ -0,0 +1,165 @@
+import logging
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Product, Leave, Loan
+
+logger = logging.getLogger(__name__)
+
+
+# Searchable fields per model. Each one becomes a column of an SQLite FTS5
+# table whose rowid is the model's primary key.
+SEARCH_INDEXES = {
+    Product: {
+        'table': 'dashboard_product_search',
+        'fields': ['job_order', 'organization_name', 'job_title'],
+    },
+    Leave: {
+        'table': 'dashboard_leave_search',
+        'fields': ['user__username', 'leave_type', 'status', 'reason'],
+    },
+    Loan: {
+        'table': 'dashboard_loan_search',
+        'fields': ['user__username', 'loan_type', 'status', 'reason'],
+    },
+}
+
+_available = None
+
+
+def _columns(index):
+    return [field.replace('__', '_') for field in index['fields']]
+
+
+def fts_available():
+    """
+    True when the FTS tables exist. Other databases, or SQLite builds
+    without FTS5, fall back to plain icontains filtering.
+    """
+    global _available
+    if _available is None:
+        if connection.vendor != 'sqlite':
+            _available = False
+        else:
+            tables = set(connection.introspection.table_names())
+            _available = all(index['table'] in tables for index in SEARCH_INDEXES.values())
+    return _available
+
+
+def create_search_tables(rebuild=False):
+    global _available
+    if connection.vendor != 'sqlite':
+        _available = False
+        return False
+
+    existing = set(connection.introspection.table_names())
+    try:
+        with connection.cursor() as cursor:
+            for model, index in SEARCH_INDEXES.items():
+                if index['table'] not in existing:
+                    cursor.execute(
+                        f"CREATE VIRTUAL TABLE {index['table']} USING fts5({', '.join(_columns(index))})"
+                    )
+    except Exception:
+        logger.exception("SQLite FTS5 is not available, search will use icontains")
+        _available = False
+        return False
+
+    _available = True
+    for model, index in SEARCH_INDEXES.items():
+        if rebuild or index['table'] not in existing:
+            rebuild_index(model)
+    return True
+
+
+def rebuild_index(model, batch_size=1000):
+    index = SEARCH_INDEXES[model]
+    columns = _columns(index)
+    insert = (
+        f"INSERT INTO {index['table']} (rowid, {', '.join(columns)}) "
+        f"VALUES (%s, {', '.join(['%s'] * len(columns))})"
+    )
+    rows = model.objects.order_by().values_list('id', *index['fields'])
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {index['table']}")
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                cursor.executemany(insert, batch)
+                batch = []
+        if batch:
+            cursor.executemany(insert, batch)
+
+
+def index_objects(model, ids):
+    """
+    Refresh the search rows for the given primary keys.
+    """
+    if not fts_available() or model not in SEARCH_INDEXES:
+        return
+    index = SEARCH_INDEXES[model]
+    columns = _columns(index)
+    ids = list(ids)
+    if not ids:
+        return
+    rows = list(model.objects.filter(id__in=ids).values_list('id', *index['fields']))
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {index['table']} WHERE rowid IN ({placeholders})", ids)
+        if rows:
+            cursor.executemany(
+                f"INSERT INTO {index['table']} (rowid, {', '.join(columns)}) "
+                f"VALUES (%s, {', '.join(['%s'] * len(columns))})",
+                rows,
+            )
+
+
+def unindex_object(model, pk):
+    if not fts_available() or model not in SEARCH_INDEXES:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_INDEXES[model]['table']} WHERE rowid = %s", [pk])
+
+
+def match_expression(query):
+    # Every word must match, each as a prefix. Quoting keeps FTS5 syntax
+    # characters typed by users from being parsed as operators.
+    words = [word.replace('"', '') for word in re.split(r'\s+', query.strip())]
+    return ' '.join(f'"{word}"*' for word in words if word)
+
+
+def search(queryset, query, ranked=True):
+    """
+    Filter `queryset` to rows matching the search box `query`.
+
+    With `ranked`, the best matches come first, ahead of the queryset's
+    own ordering.
+    """
+    model = queryset.model
+    index = SEARCH_INDEXES[model]
+    match = match_expression(query)
+    if not match:
+        return queryset
+
+    if not fts_available():
+        lookups = [Q(**{f'{field}__icontains': query}) for field in index['fields']]
+        return queryset.filter(reduce(or_, lookups))
+
+    table = index['table']
+    queryset = queryset.filter(
+        id__in=RawSQL(f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [match])
+    )
+    if ranked:
+        rank = RawSQL(
+            f"SELECT rank FROM {table} WHERE {table} MATCH %s AND rowid = {model._meta.db_table}.id",
+            [match],
+        )
+        queryset = queryset.annotate(search_rank=rank)\
+            .order_by('search_rank', *queryset.query.order_by)
+    return queryset
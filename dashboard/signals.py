@@ -0,0 +1,229 @@
+from django.contrib.auth.models import User, Group
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete, m2m_changed, post_migrate
+from django.dispatch import receiver
+from .models import Product, ProductStatusHistory, Order, Leave, Loan, Profile
+from .counters import bump, CUSTOMER_GROUP_ID
+from .pdf_cache import invalidate_product
+from .images import generate_renditions
+from .search import create_search_tables, index_objects, unindex_object
+from .schema import create_missing_indexes
+from .roles import invalidate_roles
+from .loan_dashboard import loans_changed
+from .rollups import day_of, mark_changed, user_changed
+from .availability import move_department, sync_leave
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_pdfs(sender, instance, **kwargs):
+    invalidate_product(instance.id)
+
+
+@receiver(post_save, sender=ProductStatusHistory)
+@receiver(post_delete, sender=ProductStatusHistory)
+def invalidate_status_history_pdfs(sender, instance, **kwargs):
+    invalidate_product(instance.product_id)
+
+
+@receiver(post_save, sender=Product)
+def build_product_image_renditions(sender, instance, **kwargs):
+    # Renditions that are already up to date are left alone, so this
+    # only does work when a new image has been uploaded
+    if instance.image:
+        generate_renditions(instance.image)
+
+
+
+# Dashboard counters
+
+@receiver(post_save, sender=Product)
+def count_product_saved(sender, instance, created, **kwargs):
+    if created:
+        bump(products=1)
+
+
+@receiver(post_delete, sender=Product)
+def count_product_deleted(sender, instance, **kwargs):
+    bump(products=-1)
+
+
+@receiver(post_save, sender=Order)
+def count_order_saved(sender, instance, created, **kwargs):
+    if created:
+        bump(orders=1)
+
+
+@receiver(post_delete, sender=Order)
+def count_order_deleted(sender, instance, **kwargs):
+    bump(orders=-1)
+
+
+@receiver(post_init, sender=Leave)
+@receiver(post_init, sender=Loan)
+def remember_counted_status(sender, instance, **kwargs):
+    # Lets post_save tell whether a request moved in or out of Pending
+    instance._counted_status = instance.status
+
+
+def _pending_delta(instance, created):
+    was_pending = not created and instance._counted_status == 'Pending'
+    is_pending = instance.status == 'Pending'
+    instance._counted_status = instance.status
+    return int(is_pending) - int(was_pending)
+
+
+@receiver(post_save, sender=Leave)
+def count_leave_saved(sender, instance, created, **kwargs):
+    bump(leaves=int(created), pending_leaves=_pending_delta(instance, created))
+
+
+@receiver(post_delete, sender=Leave)
+def count_leave_deleted(sender, instance, **kwargs):
+    bump(leaves=-1, pending_leaves=-int(instance._counted_status == 'Pending'))
+
+
+@receiver(post_save, sender=Loan)
+def count_loan_saved(sender, instance, created, **kwargs):
+    bump(loans=int(created), pending_loans=_pending_delta(instance, created))
+
+
+@receiver(post_delete, sender=Loan)
+def count_loan_deleted(sender, instance, **kwargs):
+    bump(loans=-1, pending_loans=-int(instance._counted_status == 'Pending'))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def count_customer_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    # post_add only reports rows that were really added; removals and
+    # clears are counted beforehand, while the rows still exist
+    if reverse:
+        # group.user_set changes: instance is the group, pk_set the users
+        if instance.pk != CUSTOMER_GROUP_ID:
+            return
+        if action == 'post_add':
+            bump(customers=len(pk_set))
+        elif action == 'pre_remove':
+            bump(customers=-instance.user_set.filter(pk__in=pk_set).count())
+        elif action == 'pre_clear':
+            bump(customers=-instance.user_set.count())
+    else:
+        # user.groups changes: instance is the user, pk_set the groups
+        if action == 'post_add':
+            bump(customers=int(CUSTOMER_GROUP_ID in pk_set))
+        elif action == 'pre_remove' and CUSTOMER_GROUP_ID in pk_set:
+            bump(customers=-int(instance.groups.filter(pk=CUSTOMER_GROUP_ID).exists()))
+        elif action == 'pre_clear':
+            bump(customers=-int(instance.groups.filter(pk=CUSTOMER_GROUP_ID).exists()))
+
+
+@receiver(pre_delete, sender=User)
+def count_customer_deleted(sender, instance, **kwargs):
+    # Group rows go away with the user without an m2m_changed signal
+    if instance.groups.filter(pk=CUSTOMER_GROUP_ID).exists():
+        bump(customers=-1)
+
+
+
+# Search index
+
+@receiver(post_migrate)
+def create_search_index(sender, **kwargs):
+    if sender.name == 'dashboard':
+        create_search_tables()
+
+
+@receiver(post_migrate)
+def create_model_indexes(sender, **kwargs):
+    # syncdb only creates indexes along with new tables
+    if sender.name == 'dashboard':
+        create_missing_indexes()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Leave)
+@receiver(post_save, sender=Loan)
+def index_saved_object(sender, instance, **kwargs):
+    index_objects(sender, [instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Leave)
+@receiver(post_delete, sender=Loan)
+def unindex_deleted_object(sender, instance, **kwargs):
+    unindex_object(sender, instance.pk)
+
+
+@receiver(post_save, sender=User)
+def reindex_user_requests(sender, instance, created, update_fields=None, **kwargs):
+    # Leave and loan rows carry the username; login only touches last_login
+    if created or (update_fields and 'username' not in update_fields):
+        return
+    index_objects(Leave, Leave.objects.filter(user=instance).values_list('id', flat=True))
+    index_objects(Loan, Loan.objects.filter(user=instance).values_list('id', flat=True))
+
+
+
+# Role cache
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_changed_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        instance.__dict__.pop('_roles_cache', None)
+        invalidate_roles([instance.pk])
+    elif pk_set:
+        invalidate_roles(pk_set)
+    else:
+        # group.user_set.clear() does not say which users were affected
+        invalidate_roles()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_roles(sender, instance, **kwargs):
+    invalidate_roles()
+
+
+@receiver(post_save, sender=Loan)
+@receiver(post_delete, sender=Loan)
+def mark_loan_dashboard_stale(sender, instance, **kwargs):
+    loans_changed()
+
+
+
+# Daily rollups
+
+@receiver(post_save, sender=Leave)
+@receiver(post_save, sender=Loan)
+@receiver(post_delete, sender=Leave)
+@receiver(post_delete, sender=Loan)
+def mark_rollup_day_changed(sender, instance, **kwargs):
+    mark_changed(sender, [day_of(instance.applied_date)])
+
+
+@receiver(post_init, sender=Profile)
+def remember_rollup_department(sender, instance, **kwargs):
+    # Lets post_save tell whether the user moved department
+    instance._rollup_department = instance.__dict__.get('department')
+
+
+@receiver(post_save, sender=Profile)
+def mark_department_days_changed(sender, instance, created, **kwargs):
+    if created or instance.department != instance._rollup_department:
+        user_changed(instance.user_id)
+    instance._rollup_department = instance.department
+
+
+
+# Staff availability
+
+@receiver(post_save, sender=Leave)
+def sync_leave_absence(sender, instance, **kwargs):
+    # Deleting a leave cascades to its absence days
+    sync_leave(instance)
+
+
+@receiver(post_save, sender=Profile)
+def move_absence_department(sender, instance, **kwargs):
+    move_department(instance.user_id, instance.department)
@@ -0,0 +1,212 @@
+from django.contrib.auth.models import User
+from django.db.models import Avg, Count, Exists, F, OuterRef, Q, Sum, DurationField, ExpressionWrapper
+from django.utils import timezone
+
+from .models import Leave, Loan, StaffAbsence
+
+
+# Time between applying and getting a response
+RESPONSE_TIME = ExpressionWrapper(F('response_date') - F('applied_date'), output_field=DurationField())
+RESPONDED = ~Q(status='Pending') & Q(response_date__isnull=False)
+
+
+def duration_in_days(duration):
+    if not duration:
+        return 0
+    return round(duration.total_seconds() / 86400, 1)
+
+
+class LeaveStats:
+    """
+    Everything the admin leave dashboard shows, from a fixed number of
+    queries no matter how many leave types or requests exist.
+    """
+
+    def __init__(self, queryset=None, now=None):
+        self.queryset = queryset if queryset is not None else Leave.objects.all()
+        self.now = now or timezone.now()
+
+    def counts(self):
+        # Status, current month and response time figures in a single pass
+        this_month = Q(applied_date__year=self.now.year, applied_date__month=self.now.month)
+        return self.queryset.aggregate(
+            total=Count('id'),
+            pending=Count('id', filter=Q(status='Pending')),
+            approved=Count('id', filter=Q(status='Approved')),
+            rejected=Count('id', filter=Q(status='Rejected')),
+            monthly=Count('id', filter=this_month),
+            monthly_approved=Count('id', filter=this_month & Q(status='Approved')),
+            monthly_rejected=Count('id', filter=this_month & Q(status='Rejected')),
+            average_response=Avg(RESPONSE_TIME, filter=RESPONDED),
+        )
+
+    def by_type(self):
+        totals = dict(
+            self.queryset.order_by()
+            .values_list('leave_type')
+            .annotate(total=Count('id'))
+        )
+        return {leave_type: totals.get(leave_type, 0) for leave_type, _ in Leave.LEAVE_TYPES}
+
+    def by_department(self):
+        return list(
+            self.queryset.values('user__dashboard_profile__department')
+            .annotate(total=Count('id'))
+            .order_by('-total')
+        )
+
+    def staff(self):
+        # Who is away comes from the per-day absence index, so this is one
+        # pass over users with an indexed probe each rather than a join
+        # against every leave
+        today = timezone.localdate(self.now)
+        away = StaffAbsence.objects.filter(user=OuterRef('pk'), day=today)
+        return User.objects.aggregate(
+            total=Count('id', filter=Q(is_active=True)),
+            on_leave=Count('id', filter=Q(Exists(away), is_active=True)),
+        )
+
+    def recent_requests(self, limit=5):
+        return list(
+            self.queryset.filter(status='Pending')
+            .select_related('user')
+            .order_by('-applied_date')[:limit]
+        )
+
+    def as_context(self):
+        counts = self.counts()
+        staff = self.staff()
+        total = counts['total']
+
+        return {
+            # Staff Statistics
+            'total_staff': staff['total'],
+            'staff_on_leave': staff['on_leave'],
+            'available_staff': staff['total'] - staff['on_leave'],
+
+            # Leave Counts
+            'total_leaves': total,
+            'pending_leaves': counts['pending'],
+            'approved_leaves': counts['approved'],
+            'rejected_leaves': counts['rejected'],
+
+            # Monthly Statistics
+            'monthly_leaves': counts['monthly'],
+            'monthly_approved': counts['monthly_approved'],
+            'monthly_rejected': counts['monthly_rejected'],
+
+            # Distribution and Analysis
+            'leave_by_type': self.by_type(),
+            'department_stats': self.by_department(),
+            'recent_requests': self.recent_requests(),
+
+            # Metrics
+            'leave_approval_rate': round((counts['approved'] / total * 100), 2) if total > 0 else 0,
+            'average_response_time': duration_in_days(counts['average_response']),
+        }
+
+
+class LoanStats:
+    """
+    Everything the admin loan dashboard shows: status, monthly and amount
+    figures from one conditional aggregate, and the type and department
+    breakdowns from one GROUP BY each.
+    """
+
+    def __init__(self, queryset=None, now=None):
+        self.queryset = queryset if queryset is not None else Loan.objects.all()
+        self.now = now or timezone.now()
+
+    def counts(self):
+        this_month = Q(applied_date__year=self.now.year, applied_date__month=self.now.month)
+        return self.queryset.aggregate(
+            total=Count('id'),
+            pending=Count('id', filter=Q(status='Pending')),
+            approved=Count('id', filter=Q(status='Approved')),
+            rejected=Count('id', filter=Q(status='Rejected')),
+            monthly=Count('id', filter=this_month),
+            monthly_approved=Count('id', filter=this_month & Q(status='Approved')),
+            monthly_rejected=Count('id', filter=this_month & Q(status='Rejected')),
+            total_amount=Sum('amount'),
+            approved_amount=Sum('amount', filter=Q(status='Approved')),
+            pending_amount=Sum('amount', filter=Q(status='Pending')),
+            average_response=Avg(RESPONSE_TIME, filter=RESPONDED),
+        )
+
+    def by_type(self):
+        totals = dict(
+            self.queryset.order_by()
+            .values_list('loan_type')
+            .annotate(total=Count('id'))
+        )
+        return {loan_type: totals.get(loan_type, 0) for loan_type, _ in Loan.LOAN_TYPES}
+
+    def by_department(self):
+        return list(
+            self.queryset.values('user__dashboard_profile__department')
+            .annotate(
+                total=Count('id'),
+                total_amount=Sum('amount'),
+                approved_count=Count('id', filter=Q(status='Approved')),
+            )
+            .order_by('-total')
+        )
+
+    def staff(self):
+        today = timezone.localdate(self.now)
+        return User.objects.aggregate(
+            total=Count('id', filter=Q(is_active=True), distinct=True),
+            with_loans=Count('id', filter=Q(
+                loan__status='Approved',
+                loan__start_date__lte=today,
+                loan__end_date__gte=today,
+            ), distinct=True),
+        )
+
+    def recent_requests(self, limit=5):
+        return list(
+            self.queryset.filter(status='Pending')
+            .select_related('user')
+            .order_by('-applied_date')[:limit]
+        )
+
+    def as_context(self):
+        counts = self.counts()
+        staff = self.staff()
+        total = counts['total']
+
+        return {
+            # Staff Statistics
+            'total_staff': staff['total'],
+            'staff_with_loans': staff['with_loans'],
+            'available_staff': staff['total'] - staff['with_loans'],
+
+            # Loan Counts
+            'total_loans': total,
+            'pending_loans': counts['pending'],
+            'approved_loans': counts['approved'],
+            'rejected_loans': counts['rejected'],
+
+            # Monthly Statistics
+            'monthly_loans': counts['monthly'],
+            'monthly_approved': counts['monthly_approved'],
+            'monthly_rejected': counts['monthly_rejected'],
+
+            # Distribution and Analysis
+            'loan_by_type': self.by_type(),
+            'department_stats': self.by_department(),
+            'recent_requests': self.recent_requests(),
+
+            # Financial Metrics
+            'total_loan_amount': counts['total_amount'] or 0,
+            'approved_loan_amount': counts['approved_amount'] or 0,
+            'pending_loan_amount': counts['pending_amount'] or 0,
+
+            # Performance Metrics
+            'loan_approval_rate': round((counts['approved'] / total * 100), 2) if total > 0 else 0,
+            'average_response_time': duration_in_days(counts['average_response']),
+
+            # Additional Metrics
+            'current_month': self.now.strftime('%B %Y'),
+            'loan_types': dict(Loan.LOAN_TYPES),
+        }
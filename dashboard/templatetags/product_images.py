@@ -0,0 +1,13 @@
+from django import template
+
+from dashboard.images import rendition_url
+
+register = template.Library()
+
+
+@register.filter
+def rendition(image, name):
+    """
+    Usage: <img src="{{ product.image|rendition:'thumb' }}">
+    """
+    return rendition_url(image, name)
@@ -1,3 +1,564 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.core import mail
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook
+
+from .availability import calendar, staff_out
+from .counters import CUSTOMER_GROUP_ID
+from .customers import customer_directory, customer_history, sort_customers
+from .decisions import bulk_decide
+from .export_jobs import EXPORTS, expire_stale_jobs, run_export_job, submit_export
+from .imports import ImportFileError, import_job_orders
+from .loan_dashboard import current_version, loan_dashboard_context
+from .models import (
+    DailyRollup, ExportJob, Leave, Loan, Order, OutboxEmail, Product, ProductStatusHistory, Profile, RollupChange,
+    StaffAbsence, format_job_order,
+)
+from .outbox import drain_outbox, queue_email, queue_emails, schedule_wakeup
+from .pagination import CursorPaginator
+from .pdf_cache import cache_key
+from .rollups import refresh_days, refresh_rollups
+from .search import fts_available, search
+from .stats import LeaveStats, LoanStats
+from .timeline import record_status
+
+
+class LeaveStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('staff', 'staff@example.com', 'password')
+        User.objects.create_user('other', 'other@example.com', 'password')
+        today = timezone.localdate()
+        for i, status in enumerate(['Pending', 'Approved', 'Approved', 'Rejected'] * 3):
+            Leave.objects.create(
+                user=self.user,
+                leave_type=Leave.LEAVE_TYPES[i % 3][0],
+                start_date=today,
+                end_date=today + timedelta(days=2),
+                reason='Test',
+                status=status,
+                response_date=None if status == 'Pending' else timezone.now() + timedelta(days=1),
+            )
+
+    def test_query_count_does_not_grow_with_leave_types(self):
+        # counts, staff, by type, by department, recent requests
+        with self.assertNumQueries(5):
+            context = LeaveStats().as_context()
+
+        self.assertEqual(context['total_leaves'], 12)
+        self.assertEqual(context['pending_leaves'], 3)
+        self.assertEqual(context['approved_leaves'], 6)
+        self.assertEqual(context['rejected_leaves'], 3)
+        self.assertEqual(context['leave_approval_rate'], 50.0)
+        self.assertEqual(context['average_response_time'], 1.0)
+        self.assertEqual(context['total_staff'], 2)
+        self.assertEqual(context['staff_on_leave'], 1)
+        self.assertEqual(context['available_staff'], 1)
+        self.assertEqual(sum(context['leave_by_type'].values()), 12)
+        self.assertEqual(len(context['recent_requests']), 3)
+
+
+class LoanStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('staff', 'staff@example.com', 'password')
+        today = timezone.localdate()
+        loan_types = [loan_type for loan_type, _ in Loan.LOAN_TYPES]
+        for i, status in enumerate(['Pending', 'Approved', 'Approved', 'Rejected'] * 5):
+            Loan.objects.create(
+                user=self.user,
+                loan_type=loan_types[i % len(loan_types)],
+                amount=Decimal('100.00'),
+                start_date=today - timedelta(days=1),
+                end_date=today + timedelta(days=30),
+                reason='Test',
+                status=status,
+                response_date=None if status == 'Pending' else timezone.now() + timedelta(days=2),
+            )
+
+    def test_query_count_does_not_grow_with_loan_types(self):
+        # counts, staff, by type, by department, recent requests
+        with self.assertNumQueries(5):
+            context = LoanStats().as_context()
+
+        self.assertEqual(context['total_loans'], 20)
+        self.assertEqual(context['pending_loans'], 5)
+        self.assertEqual(context['approved_loans'], 10)
+        self.assertEqual(context['rejected_loans'], 5)
+        self.assertEqual(context['monthly_loans'], 20)
+        self.assertEqual(context['approved_loan_amount'], Decimal('1000.00'))
+        self.assertEqual(context['pending_loan_amount'], Decimal('500.00'))
+        self.assertEqual(context['loan_approval_rate'], 50.0)
+        self.assertEqual(context['average_response_time'], 2.0)
+        self.assertEqual(context['staff_with_loans'], 1)
+        self.assertEqual(sum(context['loan_by_type'].values()), 20)
+        self.assertEqual(set(context['loan_by_type']), {loan_type for loan_type, _ in Loan.LOAN_TYPES})
+        self.assertEqual(len(context['recent_requests']), 5)
+
+    def test_department_breakdown_in_one_group_by(self):
+        Profile.objects.create(user=self.user, department='FIN')
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        Profile.objects.create(user=other, department='HR')
+        today = timezone.localdate()
+        Loan.objects.create(
+            user=other, loan_type=Loan.LOAN_TYPES[0][0], amount=Decimal('50.00'),
+            start_date=today, end_date=today, reason='Test', status='Approved',
+        )
+
+        with self.assertNumQueries(1):
+            departments = LoanStats().by_department()
+        self.assertEqual(departments, [
+            {'user__dashboard_profile__department': 'FIN', 'total': 20,
+             'total_amount': Decimal('2000.00'), 'approved_count': 10},
+            {'user__dashboard_profile__department': 'HR', 'total': 1,
+             'total_amount': Decimal('50.00'), 'approved_count': 1},
+        ])
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_OUTBOX_IN_PROCESS=False,
+    EMAIL_OUTBOX_BATCH_SIZE=50,
+)
+class OutboxTests(TestCase):
+    def test_drain_sends_every_batch(self):
+        queue_emails([(f'Subject {i}', 'Body', [f'user{i}@example.com']) for i in range(120)])
+
+        self.assertEqual(drain_outbox(), (120, 0))
+        self.assertEqual(len(mail.outbox), 120)
+        self.assertFalse(OutboxEmail.objects.exclude(status='sent').exists())
+
+    def test_failed_send_is_retried_later(self):
+        queue_email('Subject', 'Body', ['user@example.com'])
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('down')):
+            self.assertEqual(drain_outbox(), (0, 0))
+
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.status, 'pending')
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        with mock.patch('threading.Timer') as timer:
+            schedule_wakeup()
+        self.assertGreater(timer.call_args[0][0], 0)
+
+
+class JobOrderSequenceTests(TestCase):
+    def test_explicit_job_order_is_skipped_by_the_sequence(self):
+        year = timezone.now().strftime('%y')
+        first = Product.objects.create(name='First')
+        number = int(first.job_order.split('-')[1])
+        Product.objects.create(name='Explicit', job_order=format_job_order(number + 1, year))
+
+        generated = Product.objects.create(name='Generated')
+        self.assertEqual(generated.job_order, format_job_order(number + 2, year))
+
+    def test_editing_a_product_leaves_the_sequence_alone(self):
+        product = Product.objects.create(name='First')
+        product.name = 'Renamed'
+        with mock.patch('dashboard.models.reserve_job_orders') as reserve:
+            product.save()
+        reserve.assert_not_called()
+
+
+class PdfCacheTests(TestCase):
+    def test_update_without_signals_changes_the_key(self):
+        product = Product.objects.create(name='Job', quantity=10)
+        key = cache_key('single', product, 'layout')
+
+        Product.objects.filter(id=product.id).update(quantity=20)
+        product.refresh_from_db()
+        self.assertNotEqual(cache_key('single', product, 'layout'), key)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.acme = Product.objects.create(name='A', organization_name='Acme Packaging', job_title='Bread bags')
+        self.other = Product.objects.create(name='B', organization_name='Globex', job_title='Rice sacks')
+
+    def test_prefix_words_match_through_the_index(self):
+        self.assertTrue(fts_available())
+        self.assertEqual(list(search(Product.objects.all(), 'acm brea')), [self.acme])
+        # FTS5 syntax typed into the box is searched for, not parsed
+        self.assertEqual(list(search(Product.objects.all(), 'globex OR "acme')), [])
+
+        self.other.job_title = 'Bread rolls'
+        self.other.save()
+        self.assertEqual(set(search(Product.objects.all(), 'bread')), {self.acme, self.other})
+
+    def test_falls_back_to_icontains_without_fts(self):
+        with mock.patch('dashboard.search.fts_available', return_value=False):
+            self.assertEqual(list(search(Product.objects.all(), 'packag')), [self.acme])
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        # Equal timestamps make the id tiebreaker matter
+        created = timezone.now()
+        self.products = [
+            Product.objects.create(name=f'Job {i}', date_created=created - timedelta(days=i // 2))
+            for i in range(7)
+        ]
+
+    def test_walks_every_row_once_in_both_directions(self):
+        paginator = CursorPaginator(Product.objects.all(), per_page=3)
+        pages, page = [], paginator.get_page()
+        while True:
+            pages.append([product.id for product in page])
+            if not page.has_next():
+                break
+            page = paginator.get_page(page.next_cursor)
+
+        expected = [product.id for product in sorted(self.products, key=lambda p: (p.date_created, p.id), reverse=True)]
+        self.assertEqual(sum(pages, []), expected)
+        self.assertEqual([len(ids) for ids in pages], [3, 3, 1])
+
+        previous = paginator.get_page(page.previous_cursor)
+        self.assertEqual([product.id for product in previous], pages[1])
+
+    def test_tampered_cursor_starts_from_the_first_page(self):
+        paginator = CursorPaginator(Product.objects.all(), per_page=3)
+        first = paginator.get_page()
+        self.assertEqual(list(paginator.get_page('not-a-cursor')), list(first))
+        self.assertFalse(first.has_previous())
+        self.assertEqual(paginator.estimated_total(cap=5), (5, True))
+
+
+class ImportTests(TestCase):
+    def test_blank_rows_skip_numbers_given_in_the_same_file(self):
+        year = timezone.now().strftime('%y')
+        Product.objects.create(name='Existing', job_order=format_job_order(1, year))
+        upload = io.BytesIO(
+            f'Job Order,Name\n{format_job_order(2, year)},A\n{format_job_order(3, year)},B\n,C\n'.encode()
+        )
+
+        result = import_job_orders(upload, 'jobs.csv')
+        self.assertEqual(result.errors, [])
+        self.assertEqual(result.created, 3)
+        self.assertEqual(Product.objects.get(name='C').job_order, format_job_order(4, year))
+
+    def test_bad_rows_are_reported_and_the_rest_imported(self):
+        year = timezone.now().strftime('%y')
+        Product.objects.create(name='Existing', job_order=format_job_order(1, year))
+        upload = io.BytesIO(
+            'Job Order,Name,Quantity\n'
+            f'{format_job_order(1, year)},Taken,1\n'
+            ',Bad quantity,lots\n'
+            f'{format_job_order(2, year)},Good,3\n'
+            f'{format_job_order(2, year)},Repeated,4\n'.encode()
+        )
+
+        result = import_job_orders(upload, 'jobs.csv')
+        self.assertEqual(result.created, 1)
+        self.assertEqual([(error.row, error.field) for error in result.errors], [
+            (2, 'job_order'), (3, 'quantity'), (5, 'job_order'),
+        ])
+        self.assertEqual(Product.objects.get(job_order=format_job_order(2, year)).quantity, 3)
+
+    def test_xlsx_rows_are_imported(self):
+        workbook = Workbook()
+        workbook.active.append(['Name', 'Quantity'])
+        workbook.active.append(['Sheet job', 25])
+        upload = io.BytesIO()
+        workbook.save(upload)
+        upload.seek(0)
+
+        result = import_job_orders(upload, 'jobs.xlsx')
+        self.assertEqual(result.errors, [])
+        self.assertEqual(Product.objects.get(name='Sheet job').quantity, 25)
+
+    def test_broken_xlsx_is_rejected(self):
+        with self.assertRaises(ImportFileError):
+            import_job_orders(io.BytesIO(b'not a workbook'), 'jobs.xlsx')
+
+    def test_non_utf8_file_is_rejected(self):
+        upload = io.BytesIO('Name\nCaf\xe9\n'.encode('cp1252'))
+        with self.assertRaises(ImportFileError):
+            import_job_orders(upload, 'jobs.csv')
+        self.assertFalse(Product.objects.exists())
+
+
+@override_settings(EMAIL_OUTBOX_IN_PROCESS=False)
+class BulkDecisionTests(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', 'manager@example.com', 'password')
+        self.staff = User.objects.create_user('staff', 'staff@example.com', 'password')
+        today = timezone.localdate()
+        self.leaves = [
+            Leave.objects.create(
+                user=self.staff, leave_type='Annual', start_date=today, end_date=today,
+                reason='Test', status=status,
+            )
+            for status in ['Pending', 'Pending', 'Approved']
+        ]
+
+    def test_outcome_per_id(self):
+        first, second, approved = self.leaves
+        results = bulk_decide(Leave, [first.id, second.id, approved.id, 999, 'x'], 'approve', self.manager)
+
+        self.assertEqual(results, {
+            str(first.id): 'Approved',
+            str(second.id): 'Approved',
+            str(approved.id): 'already approved',
+            '999': 'not found',
+            'x': 'invalid id',
+        })
+        self.assertEqual(OutboxEmail.objects.count(), 2)
+
+    def test_request_decided_concurrently_is_not_reported_or_notified(self):
+        first, second, _ = self.leaves
+        update = QuerySet.update
+
+        def racing_update(queryset, **fields):
+            # Another manager rejects the second leave between the read and the UPDATE
+            if queryset.model is Leave and not racing_update.done:
+                racing_update.done = True
+                update(Leave.objects.filter(id=second.id), status='Rejected')
+            return update(queryset, **fields)
+        racing_update.done = False
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=racing_update):
+            results = bulk_decide(Leave, [first.id, second.id], 'approve', self.manager)
+
+        self.assertEqual(results, {str(first.id): 'Approved', str(second.id): 'already rejected'})
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+        self.assertEqual(Leave.objects.get(id=second.id).status, 'Rejected')
+
+
+@override_settings(LOAN_DASHBOARD_REFRESH_IN_PROCESS=False)
+class LoanDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('staff', 'staff@example.com', 'password')
+
+    def create_loan(self):
+        today = timezone.localdate()
+        return Loan.objects.create(
+            user=self.user, loan_type=Loan.LOAN_TYPES[0][0], amount=Decimal('100.00'),
+            start_date=today, end_date=today, reason='Test',
+        )
+
+    def test_loan_change_is_seen_through_the_database_version(self):
+        self.assertEqual(loan_dashboard_context()['total_loans'], 0)
+        version = current_version()
+
+        self.create_loan()
+        # The counter lives in the database, so another process sees it too
+        self.assertEqual(current_version(), version + 1)
+        self.assertEqual(loan_dashboard_context()['total_loans'], 1)
+
+    def test_current_snapshot_costs_one_query(self):
+        loan_dashboard_context()
+        # Only the version is read back
+        with self.assertNumQueries(1):
+            self.assertEqual(loan_dashboard_context()['total_loans'], 0)
+
+    def test_stale_snapshot_is_served_while_refreshed_in_the_background(self):
+        loan_dashboard_context()
+        self.create_loan()
+
+        with override_settings(LOAN_DASHBOARD_REFRESH_IN_PROCESS=True), \
+                mock.patch('dashboard.loan_dashboard._get_executor') as executor:
+            self.assertEqual(loan_dashboard_context()['total_loans'], 0)
+            loan_dashboard_context()
+        # Two stale reads still schedule one refresh
+        self.assertEqual(executor.return_value.submit.call_count, 1)
+
+
+@override_settings(EXPORT_JOBS_IN_PROCESS=False)
+class ExportJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def test_identical_requests_share_a_job(self):
+        job, created = submit_export(self.user, 'products')
+        again, created_again = submit_export(self.user, 'products')
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(job.id, again.id)
+
+    def test_database_rejects_a_second_active_job(self):
+        job, _ = submit_export(self.user, 'products')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ExportJob.objects.create(kind=job.kind, params=job.params, dedupe_key=job.dedupe_key, requested_by=self.user)
+
+    def test_job_left_running_by_a_dead_worker_is_not_reused(self):
+        job, _ = submit_export(self.user, 'products')
+        ExportJob.objects.filter(id=job.id).update(status='running', started_at=timezone.now() - timedelta(hours=1))
+
+        fresh, created = submit_export(self.user, 'products')
+        self.assertTrue(created)
+        self.assertNotEqual(fresh.id, job.id)
+        self.assertEqual(ExportJob.objects.get(id=job.id).status, 'failed')
+
+    def test_worker_finishing_after_expiry_does_not_revive_the_job(self):
+        job, _ = submit_export(self.user, 'products')
+
+        def slow_render(output, user, params):
+            output.write(b'%PDF')
+            # The worker stalls past the timeout and the job is expired
+            ExportJob.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(hours=1))
+            expire_stale_jobs()
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        with override_settings(MEDIA_ROOT=media_root), mock.patch.dict(EXPORTS['products'], render=slow_render):
+            self.assertIsNone(run_export_job(job.id))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertFalse(job.file)
+        self.assertEqual(os.listdir(os.path.join(media_root, 'exports')), [])
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('staff', 'staff@example.com', 'password')
+        self.profile = Profile.objects.create(user=self.user, department='IT')
+        today = timezone.localdate()
+        self.leave = Leave.objects.create(
+            user=self.user, leave_type='Annual', start_date=today, end_date=today, reason='Test',
+        )
+        refresh_rollups('leave')
+
+    def test_change_committed_during_a_refresh_is_kept(self):
+        day = timezone.localdate()
+        seen = RollupChange.objects.create(kind='leave', day=day)
+        late_id = seen.id
+        RollupChange.objects.filter(id=seen.id).update(id=seen.id + 10)
+
+        def refresh_with_late_change(kind, days):
+            # A writer that took a lower id commits only now
+            RollupChange.objects.create(id=late_id, kind='leave', day=day)
+            return refresh_days(kind, days)
+
+        with mock.patch('dashboard.rollups.refresh_days', side_effect=refresh_with_late_change):
+            refresh_rollups('leave')
+        self.assertEqual(list(RollupChange.objects.values_list('id', flat=True)), [late_id])
+
+    def test_department_change_moves_the_rollups(self):
+        self.profile.department = 'HR'
+        self.profile.save()
+
+        refresh_rollups('leave')
+        self.assertEqual(list(DailyRollup.objects.values_list('department', flat=True)), ['HR'])
+
+
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', 'staff@example.com', 'password')
+        self.profile = Profile.objects.create(user=self.staff, department='IT')
+        self.today = timezone.localdate()
+        self.leave = Leave.objects.create(
+            user=self.staff, leave_type='Sick', start_date=self.today, end_date=self.today + timedelta(days=2),
+            reason='Test', status='Approved',
+        )
+
+    def test_approved_leave_is_indexed_per_day(self):
+        self.assertEqual(list(staff_out(self.today)), [self.staff])
+        self.assertEqual(list(staff_out(self.today, department='HR')), [])
+        self.assertEqual(list(staff_out(self.today + timedelta(days=3))), [])
+        self.assertEqual(calendar(self.today, 7), {
+            self.staff: {self.today + timedelta(days=n): 'Sick' for n in range(3)},
+        })
+
+    def test_rejected_leave_and_department_move_are_followed(self):
+        self.profile.department = 'HR'
+        self.profile.save()
+        self.assertEqual(list(staff_out(self.today, department='HR')), [self.staff])
+
+        self.leave.status = 'Rejected'
+        self.leave.save()
+        self.assertFalse(StaffAbsence.objects.exists())
+
+
+class CustomerDirectoryTests(TestCase):
+    def setUp(self):
+        group = Group.objects.create(id=CUSTOMER_GROUP_ID, name='Customer')
+        self.busy = User.objects.create_user('busy', 'busy@example.com', 'password')
+        self.idle = User.objects.create_user('idle', 'idle@example.com', 'password')
+        group.user_set.add(self.busy, self.idle)
+        User.objects.create_user('staff', 'staff@example.com', 'password')
+
+        product = Product.objects.create(name='Job', price=Decimal('2.00'))
+        for quantity, status in [(10, 'pending'), (5, 'delivered'), (1, 'processing')]:
+            Order.objects.create(product=product, customer=self.busy, order_quantity=quantity, order_status=status)
+
+    def test_figures_are_annotated_per_customer(self):
+        with self.assertNumQueries(1):
+            customers, sort = sort_customers(customer_directory(), None)
+            customers = list(customers)
+
+        self.assertEqual(sort, '-last_order')
+        self.assertEqual(customers, [self.busy, self.idle])
+        busy, idle = customers
+        self.assertEqual(busy.order_count, 3)
+        self.assertEqual(busy.total_spend, Decimal('32.00'))
+        # Both open orders are for the same job order
+        self.assertEqual(busy.open_jobs, 1)
+        self.assertEqual((idle.order_count, idle.total_spend, idle.last_order), (0, None, None))
+
+    def test_history_is_read_in_two_queries(self):
+        with self.assertNumQueries(2):
+            customer = customer_history(self.busy.id)
+            self.assertEqual([order.order_quantity for order in customer.history], [1, 5, 10])
+            self.assertEqual(customer.history[0].product.name, 'Job')
+
+
+class StatusTimelineTests(TestCase):
+    def test_only_one_current_entry_per_product(self):
+        product = Product.objects.create(name='Job')
+        record_status(product, 'Printing')
+        record_status(product, 'Cutting')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ProductStatusHistory.objects.create(product=product, status='Packing', is_active=True)
+
+
+class BatchStatusUpdateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('floor', 'floor@example.com', 'password')
+        self.client.force_login(self.user)
+        self.products = [Product.objects.create(name=f'Job {i}') for i in range(3)]
+
+    def test_many_products_in_one_request(self):
+        first, second, _ = self.products
+        record_status(first, 'Design')
+        updates = [
+            {'product_id': first.id, 'status': 'Printing'},
+            {'product_id': second.id, 'status': 'Slitting'},
+            {'product_id': 999, 'status': 'Packed'},
+        ]
+
+        response = self.client.post(
+            reverse('update-production-status'), {'updates': updates}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([(result['product_id'], result['status']) for result in body['results']],
+                         [(first.id, 'Printing'), (second.id, 'Slitting')])
+        self.assertEqual(body['missing'], [999])
+
+        first.refresh_from_db()
+        self.assertEqual(first.production_status, 'Printing')
+        self.assertEqual(first.updated_by, self.user)
+        self.assertEqual(
+            list(first.status_history.filter(is_active=True).values_list('status', flat=True)), ['Printing'],
+        )
+        self.assertEqual(first.status_history.count(), 2)
+
+    def test_oversized_batch_is_rejected(self):
+        updates = [{'product_id': self.products[0].id, 'status': 'Printing'}] * 501
+        response = self.client.post(
+            reverse('update-production-status'), {'updates': updates}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ProductStatusHistory.objects.exists())
@@ -0,0 +1,111 @@
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import Product, ProductStatusHistory
+from .pdf_cache import invalidate_product
+
+
+# The current status of a job order lives on Product itself
+# (production_status, production_status_date, updated_by), so list views
+# read it without touching the timeline. ProductStatusHistory is only
+# appended to, and the newest row of each product is flagged is_active.
+
+
+def make_current(entry):
+    """
+    Flag `entry` as its product's current status and copy it onto the
+    product with an UPDATE of the status columns only, so totals are not
+    recalculated and nothing else is rewritten.
+    """
+    with transaction.atomic():
+        ProductStatusHistory.objects.filter(product_id=entry.product_id, is_active=True)\
+            .exclude(id=entry.id)\
+            .update(is_active=False)
+        if not entry.is_active:
+            ProductStatusHistory.objects.filter(id=entry.id).update(is_active=True)
+            entry.is_active = True
+        Product.objects.filter(id=entry.product_id).update(
+            production_status=entry.status,
+            production_status_date=entry.created_at,
+            updated_by=entry.updated_by_id,
+        )
+
+
+def record_status(product, status, user=None):
+    # Append `status` to the product's timeline and make it the current one
+    entry = record_statuses([(getattr(product, 'pk', product), status)], user)[0]
+    if isinstance(product, Product):
+        product.production_status = status
+        product.production_status_date = entry.created_at
+        product.updated_by = user
+    return entry
+
+
+def record_statuses(updates, user=None):
+    """
+    Apply many (product id, status) pairs in one transaction: one UPDATE
+    retires the current entries, one bulk_create appends the new ones and
+    one bulk UPDATE copies them onto the products. When a product appears
+    more than once the last status wins. Returns the new entries.
+    """
+    latest = {}
+    for product_id, status in updates:
+        latest[int(product_id)] = status
+    if not latest:
+        return []
+
+    with transaction.atomic():
+        ProductStatusHistory.objects.filter(product_id__in=list(latest), is_active=True).update(is_active=False)
+        entries = ProductStatusHistory.objects.bulk_create([
+            ProductStatusHistory(product_id=product_id, status=status, updated_by=user, is_active=True)
+            for product_id, status in latest.items()
+        ])
+        Product.objects.bulk_update([
+            Product(id=entry.product_id, production_status=entry.status,
+                    production_status_date=entry.created_at, updated_by=user)
+            for entry in entries
+        ], ['production_status', 'production_status_date', 'updated_by'])
+
+    # bulk_create skips the signal that drops stale PDFs
+    for product_id in latest:
+        invalidate_product(product_id)
+    return entries
+
+
+def delete_status(entry):
+    """
+    Remove a timeline entry. Only when it was the current status does the
+    product fall back to the newest remaining one.
+    """
+    with transaction.atomic():
+        entry.delete()
+        if not entry.is_active:
+            return None
+
+        latest = ProductStatusHistory.objects.filter(product_id=entry.product_id)\
+            .order_by('-created_at', '-id')\
+            .first()
+        if latest:
+            make_current(latest)
+        else:
+            Product.objects.filter(id=entry.product_id).update(
+                production_status=None,
+                production_status_date=timezone.now(),
+            )
+        return latest
+
+
+def normalize_current():
+    """
+    Leave only the newest entry of each product flagged is_active. Older
+    code never cleared the flag, so existing timelines can have every row
+    active. Returns the number of entries retired.
+    """
+    newer = ProductStatusHistory.objects.filter(product_id=OuterRef('product_id')).filter(
+        Q(created_at__gt=OuterRef('created_at')) |
+        Q(created_at=OuterRef('created_at'), id__gt=OuterRef('id'))
+    )
+    return ProductStatusHistory.objects.filter(is_active=True)\
+        .filter(Exists(newer))\
+        .update(is_active=False)
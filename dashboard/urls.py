@@ -5,12 +5,15 @@ from .views import export_products_pdf
 urlpatterns = [
     # Dashboard
     path('index/', views.index, name='dashboard-index'),
+    path('index/charts/', views.index_chart_data, name='dashboard-index-charts'),
     
     # Products
     path('products/', views.products, name='dashboard-products'),
     path('products/delete/<int:pk>/', views.product_delete, name='dashboard-products-delete'),
     path('products/detail/<int:pk>/', views.product_detail, name='dashboard-products-detail'),
     path('products/edit/<int:pk>/', views.product_edit, name='dashboard-products-edit'),
+    path('products/import/', views.product_import, name='dashboard-products-import'),
+    path('products/import/report/<uuid:token>/', views.product_import_report, name='dashboard-products-import-report'),
     path('products/<int:pk>/', views.product_detail, name='dashboard-products-detail'),
     path('product/<int:product_id>/approve/', views.approve_product, name='approve-product'),
     path('product-view/<str:job_id>/', views.product_view, name='product-view'),
@@ -30,8 +33,10 @@ urlpatterns = [
     path('leave-history/', views.leave_history, name='leave-history'),
     path('manage-leaves/', views.manage_leaves, name='manage-leaves'),
     path('update-leave-status/<int:pk>/', views.update_leave_status, name='update-leave-status'),
+    path('leaves/bulk/', views.bulk_update_leaves, name='bulk-update-leaves'),
     path('staff-dashboard/', views.staff_dashboard, name='staff-dashboard'),
     path('admin_leave_dashboard/', views.admin_leave_dashboard, name='admin_leave_dashboard'),
+    path('leaves/calendar/', views.team_calendar, name='team-calendar'),
     
     # Export Functions
     path('export-products-pdf/', export_products_pdf, name='export-products-pdf'),
@@ -40,17 +45,28 @@ urlpatterns = [
     path('export-product-view/<str:job_id>/', views.export_product_view_pdf, name='export-product-view-pdf'),
     path('export-leaves-pdf/', views.export_leaves_pdf, name='export-leaves-pdf'),
     path('export-all-leaves-pdf/', views.export_all_leaves_pdf, name='export-all-leaves-pdf'),
+    path('export-loans-pdf/', views.export_loans_pdf, name='export-loans-pdf'),
+    path('export-all-loans-pdf/', views.export_all_loans_pdf, name='export-all-loans-pdf'),
     path('delete-status-history/<int:status_id>/', views.delete_status_history, name='delete-status-history'),
 
+    # Background Exports
+    path('exports/', views.export_jobs, name='export-jobs'),
+    path('exports/<str:kind>/submit/', views.export_job_submit, name='export-job-submit'),
+    path('exports/job/<int:pk>/', views.export_job_status, name='export-job-status'),
+    path('exports/job/<int:pk>/download/', views.export_job_download, name='export-job-download'),
+
     # Export Functions
     
     path('loan/request/', views.loan_request, name='loan-request'),
     path('loans/', views.loan_list, name='loan-list'),
+    path('loans/status/', views.loan_status_check, name='loan-status-check'),
     path('loan/<int:pk>/', views.loan_detail, name='loan-detail'),
     path('loan/<int:pk>/update/', views.loan_update, name='loan-update'),
     path('loan/<int:pk>/delete/', views.loan_delete, name='loan-delete'),
     path('my-loans/', views.my_loans, name='my-loans'),
     path('pending-loans/', views.pending_loans, name='pending-loans'),
+    path('admin-loan-dashboard/', views.admin_loan_dashboard, name='admin-loan-dashboard'),
+    path('loans/bulk/', views.bulk_update_loans, name='bulk-update-loans'),
 
 
 ]
@@ -1,39 +1,52 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.models import User
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.conf import settings
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, FileResponse
 from django.utils import timezone
 from django.db.models.functions import TruncSecond
 from zoneinfo import ZoneInfo
 from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from .models import Product, Order, Leave, ProductStatusHistory, Loan
+from .models import Product, Order, Leave, ProductStatusHistory, Loan, ExportJob, DEPARTMENT_CHOICES
 from .forms import ProductForm, OrderForm,  LeaveForm, LoanForm
 from .decorators import auth_users, allowed_users, can_edit_user_data, leave_manager_only
+from .exports import ExportError, write_single_product_pdf, write_product_view_pdf, PRODUCT_VIEW_TEMPLATE
+from .stats import LeaveStats
+from .rollups import daily_trend
+from .availability import calendar
+from .counters import get_counters
+from .charts import chart_data, DEFAULT_CHART_WINDOW
+from .search import search
+from .customers import customer_directory, customer_history, sort_customers
+from .pagination import CursorPaginator
+from .roles import get_roles
+from .tabular import stream_csv, TABULAR_FORMATS, ORDER_COLUMNS, LEAVE_COLUMNS, LOAN_COLUMNS
+from .imports import ImportFileError, import_job_orders
+from .outbox import queue_email
+from .loan_dashboard import loan_dashboard_context
+from .timeline import record_status, record_statuses, delete_status
+from .decisions import DecisionError, bulk_decide, leave_notification, loan_notification
+from .pdf_cache import cached_product_pdf, template_hash, SINGLE_PRODUCT_LAYOUT_VERSION
+from .export_jobs import EXPORTS, export_filename, submit_export, can_access_job
 from django.contrib.admin.views.decorators import staff_member_required
-from django.core.paginator import Paginator
-from django.db.models import Q, Count, Sum, Avg, Min, Max
-from reportlab.platypus import Image, Spacer
+from django.db.models import Avg, Min, Max
+import json
 import os
-from django.template.loader import get_template
-from xhtml2pdf import pisa
+import tempfile
+import uuid
 from .forms import LeaveForm, LeaveResponseForm, LeaveUpdateForm, LoanUpdateForm
-from django.core.mail import send_mail
-from datetime import timedelta
+from datetime import date, timedelta
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from .decorators import can_manage_leave
 from django.contrib.auth.decorators import permission_required
 from django.contrib.auth.decorators import user_passes_test
-from django.db.models import Sum, Count
 from django.core.exceptions import ValidationError
-from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 
 
 import logging
@@ -43,35 +56,29 @@ logger = logging.getLogger(__name__)
 
 wat_timezone = ZoneInfo("Africa/Lagos")
 
+# Most job orders one batch production status request may update
+PRODUCTION_STATUS_BATCH_LIMIT = 500
+
 
 # Add the custom permission check here
 def is_staff_member(user):
-    return user.is_staff or user.groups.filter(name='Staff').exists()
+    return user.is_staff or get_roles(user).has_role('Staff')
 
 
 @login_required(login_url='user-login')
 def index(request):
-    # Product Statistics
-    product = Product.objects.all()
-    product_count = product.count()
-    
-    # Order Statistics
-    order = Order.objects.all()
-    order_count = order.count()
-    
-    # User Statistics
-    customer = User.objects.filter(groups=2, is_active=True)
-    customer_count = customer.count()
-    
+    # Card totals come from the maintained counters row
+    counters = get_counters()
+
     # Role-based statistics
-    if request.user.is_superuser or request.user.groups.filter(name='Leave Manager').exists():
+    if request.user.is_superuser or get_roles(request.user).has_role('Leave Manager'):
         # Admin/Manager view
         pending_leaves = Leave.objects.filter(status='Pending').order_by('-applied_date')
-        pending_leaves_count = pending_leaves.count()
-        staff_count = Leave.objects.all().count()  # Total leave requests for admin view
+        pending_leaves_count = counters.pending_leaves
+        staff_count = counters.leaves  # Total leave requests for admin view
         
         pending_loans = Loan.objects.filter(status='Pending').order_by('-applied_date')
-        pending_loans_count = pending_loans.count()
+        pending_loans_count = counters.pending_loans
     else:
         # Regular user view
         pending_leaves = Leave.objects.filter(
@@ -88,10 +95,9 @@ def index(request):
         pending_loans_count = pending_loans.count()
 
     context = {
-        'product': product,
-        'product_count': product_count,
-        'order_count': order_count,
-        'customer_count': customer_count,
+        'product_count': counters.products,
+        'order_count': counters.orders,
+        'customer_count': counters.customers,
         'staff_count': staff_count,
         'pending_leaves': pending_leaves[:5],
         'pending_leaves_count': pending_leaves_count,
@@ -102,6 +108,17 @@ def index(request):
     return render(request, 'dashboard/index.html', context)
 
 
+@login_required(login_url='user-login')
+@user_passes_test(lambda u: u.is_staff and u.is_superuser)
+def index_chart_data(request):
+    # Charts on the index page load from here instead of being rendered inline
+    try:
+        days = int(request.GET.get('days', DEFAULT_CHART_WINDOW))
+    except ValueError:
+        days = DEFAULT_CHART_WINDOW
+    return JsonResponse(chart_data(days))
+
+
 
 
 
@@ -137,32 +154,35 @@ def products(request):
     filter_status = request.GET.get('status', '')
     
     # Base queryset
-    products = Product.objects.annotate(
+    # The current production status is kept on the product, so the
+    # list only needs the users joined in, not the status timeline
+    products = Product.objects.select_related('created_by', 'approved_by', 'updated_by').annotate(
         local_date_created=TruncSecond('date_created', tzinfo=wat_timezone)
-    ).order_by('-local_date_created')
+    )
+    ordering = ['-date_created', '-id']
     
     # Apply filters if present
     if search_query:
-        products = products.filter(
-            Q(job_order__icontains=search_query) |
-            Q(organization_name__icontains=search_query) |
-            Q(job_title__icontains=search_query)
-        )
+        products = search(products, search_query)
+        ordering = ['search_rank'] + ordering
     
     if filter_status:
         products = products.filter(approval_status=filter_status)
     
     # Pagination
-    paginator = Paginator(products, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = CursorPaginator(products, ordering, per_page=10)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    total, total_capped = paginator.estimated_total()
 
+    counters = get_counters()
     context = {
         'products': page_obj,
+        'total': total,
+        'total_capped': total_capped,
         'form': form,
-        'customer_count': User.objects.filter(groups=2).count(),
-        'product_count': products.count(),
-        'order_count': Order.objects.count(),
+        'customer_count': counters.customers,
+        'product_count': counters.products,
+        'order_count': counters.orders,
     }
     
     return render(request, 'dashboard/products.html', context)
@@ -181,11 +201,7 @@ def approve_product(request, product_id):
         product.save()
         
         # Log the status change
-        ProductStatusHistory.objects.create(
-            product=product,
-            status=action,
-            updated_by=request.user
-        )
+        record_status(product, action, request.user)
         
         return JsonResponse({
             'success': True,
@@ -247,35 +263,35 @@ def product_detail(request, pk):
 @login_required(login_url='user-login')
 @allowed_users(allowed_roles=['Admin'])
 def customers(request):
-    customer = User.objects.filter(groups=2)
-    customer_count = customer.count()
-    product = Product.objects.all()
-    product_count = product.count()
-    order = Order.objects.all()
-    order_count = order.count()
+    query = request.GET.get('q', '')
+    customer, sort = sort_customers(customer_directory(query), request.GET.get('sort'))
+    # Sorting on the aggregates means grouping every customer anyway, so
+    # plain page numbers cost no more than a cursor here
+    page = Paginator(customer, 25).get_page(request.GET.get('page'))
+    counters = get_counters()
     context = {
-        'customer': customer,
-        'customer_count': customer_count,
-        'product_count': product_count,
-        'order_count': order_count,
+        'customer': page,
+        'query': query,
+        'sort': sort,
+        'customer_count': counters.customers,
+        'product_count': counters.products,
+        'order_count': counters.orders,
     }
     return render(request, 'dashboard/customers.html', context)
 
 @login_required(login_url='user-login')
 @allowed_users(allowed_roles=['Admin'])
 def customer_detail(request, pk):
-    customer = User.objects.filter(groups=2)
-    customer_count = customer.count()
-    product = Product.objects.all()
-    product_count = product.count()
-    order = Order.objects.all()
-    order_count = order.count()
-    customers = get_object_or_404(User, id=pk)
+    try:
+        customers = customer_history(pk)
+    except User.DoesNotExist:
+        raise Http404('No customer matches the given query.')
+    counters = get_counters()
     context = {
         'customers': customers,
-        'customer_count': customer_count,
-        'product_count': product_count,
-        'order_count': order_count,
+        'customer_count': counters.customers,
+        'product_count': counters.products,
+        'order_count': counters.orders,
     }
     return render(request, 'dashboard/customers_detail.html', context)
 
@@ -309,24 +325,75 @@ def product_delete(request, pk):
     }
     return render(request, 'dashboard/products_delete.html', context)
 
+
+@login_required
+@permission_required('dashboard.add_product', raise_exception=True)
+def product_import(request):
+    result = None
+    report_token = None
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            messages.error(request, 'Choose a CSV or XLSX file to import')
+            return redirect('dashboard-products-import')
+        dry_run = 'dry_run' in request.POST
+        try:
+            result = import_job_orders(upload, upload.name, user=request.user, dry_run=dry_run)
+        except ImportFileError as error:
+            messages.error(request, str(error))
+            return redirect('dashboard-products-import')
+
+        if result.errors:
+            # Kept in storage so the report can be downloaded from any worker
+            report_token = uuid.uuid4()
+            default_storage.save(f'import_reports/{report_token}.csv', ContentFile(''.join(result.report_lines())))
+        if dry_run:
+            messages.info(request, f'{result.valid} of {result.rows} rows are ready to import')
+        else:
+            messages.success(request, f'Imported {result.created} of {result.rows} job orders')
+
+    context = {
+        'result': result,
+        'errors': result.errors[:200] if result else [],
+        'report_token': report_token,
+    }
+    return render(request, 'dashboard/products_import.html', context)
+
+
+@login_required
+@permission_required('dashboard.add_product', raise_exception=True)
+def product_import_report(request, token):
+    name = f'import_reports/{token}.csv'
+    if not default_storage.exists(name):
+        return HttpResponse('Report not found', status=404)
+    return FileResponse(default_storage.open(name, 'rb'), as_attachment=True, filename='import_errors.csv')
+
 @login_required
 @permission_required('dashboard.view_order', raise_exception=True)
 def order(request):
-    if request.user.groups.filter(name='Admin').exists():
-        order = Order.objects.annotate(local_date_created=TruncSecond('date_created', tzinfo=wat_timezone)).order_by('-local_date_created')
+    counters = get_counters()
+    if get_roles(request.user).has_role('Admin'):
+        order = Order.objects.annotate(local_date_created=TruncSecond('date_created', tzinfo=wat_timezone))
+        order_count = counters.orders
     else:
-        order = Order.objects.filter(customer=request.user).annotate(local_date_created=TruncSecond('date_created', tzinfo=wat_timezone)).order_by('-local_date_created')
-   
-    order_count = order.count()
-    customer = User.objects.filter(groups=2)
-    customer_count = customer.count()
-    product = Product.objects.all()
-    product_count = product.count()
+        order = Order.objects.filter(customer=request.user).annotate(local_date_created=TruncSecond('date_created', tzinfo=wat_timezone))
+        order_count = order.count()
+
+    if request.GET.get('format') == 'csv':
+        return stream_csv('orders.csv', ORDER_COLUMNS, order.order_by('-date_created', '-id'))
+
+    order = order.select_related('product', 'customer').only(
+        'date_created', 'order_quantity', 'total_price', 'estimated_delivery_date', 'order_status',
+        'product__job_order', 'product__organization_name', 'product__print_product',
+        'customer__username',
+    )
+    paginator = CursorPaginator(order, ['-date_created', '-id'], per_page=25)
+    order_page = paginator.get_page(request.GET.get('cursor'))
 
     context = {
-        'order': order,
-        'customer_count': customer_count,
-        'product_count': product_count,
+        'order': order_page,
+        'customer_count': counters.customers,
+        'product_count': counters.products,
         'order_count': order_count,
     }
     return render(request, 'dashboard/order.html', context)
@@ -362,263 +429,98 @@ def order_delete(request, pk):
 
 
 
+def export_response(request, kind, **params):
+    spec = EXPORTS[kind]
+    export_format = request.GET.get('format')
+    if export_format in TABULAR_FORMATS and 'rows' in spec:
+        filename = os.path.splitext(export_filename(kind, params))[0] + '.' + export_format
+        return TABULAR_FORMATS[export_format](filename, spec['columns'], spec['rows'](request.user, params))
+
+    # Render into a temporary file and stream it back, so memory stays
+    # flat no matter how many rows the export covers
+    output = tempfile.TemporaryFile()
+    try:
+        spec['render'](output, request.user, params)
+    except ExportError as e:
+        output.close()
+        return HttpResponse(str(e))
+    output.seek(0)
+
+    return FileResponse(output, as_attachment=True, filename=export_filename(kind, params), content_type='application/pdf')
+
+
 @login_required
 @permission_required('dashboard.can_export_products', raise_exception=True)
 def export_products_pdf(request):
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="products.pdf"'
-
-    doc = SimpleDocTemplate(response, pagesize=landscape(A4), leftMargin=15, rightMargin=15, topMargin=25, bottomMargin=25)
-    elements = []
-
-    styles = getSampleStyleSheet()
-    title_style = styles['Title']
-    title_style.fontSize = 14
-    title_style.spaceAfter = 30
-    elements.append(Paragraph("City prints Product Records", title_style))
-
-    products = Product.objects.all().order_by('-date_created')
-   
-    para_style = ParagraphStyle(
-        'Normal',
-        fontSize=7,
-        leading=8,
-        wordWrap='CJK',
-        alignment=1,
-        encoding='utf-8'
-    )
-   
-    header_style = ParagraphStyle(
-        'Header',
-        fontSize=8,
-        leading=9,
-        fontName='Helvetica-Bold',
-        alignment=1,
-        encoding='utf-8'
-    )
+    return export_response(request, 'products')
 
-    headers = ['S/N', 'Date', 'Job Order Number', 'Job Name', 'Address', 'Contact', 'Package type/ Product', 'Colors', 
-              'Cutting/ Pouching', 'Thickness / Width', 'Sealing Type', 'Delivery qty', 'Price (NGN)', 'Qty (Kg)', 'Total (NGN)', 
-              'Est. Del', 'Act. Del', 'Cycle Time', 'Sub ID', 'Status', 'Created By', 'Approved By', 'Production Status']
-    
-   
-    data = [[Paragraph(header, header_style) for header in headers]]
-
-    for index, product in enumerate(products, start=1):
-        price = str(product.formatted_price()).replace('₦', 'NGN ')
-        total = str(product.formatted_total()).replace('₦', 'NGN ')
-       
-        row_data = [
-            str(index),
-            product.date_created.strftime('%d/%m/%y') if product.date_created else '',
-            Paragraph(str(product.job_order), para_style),
-            Paragraph(str(product.organization_name), para_style),
-            Paragraph(str(product.address), para_style),
-            Paragraph(str(product.contact_number), para_style),
-            Paragraph(str(product.print_product), para_style),
-            Paragraph(str(product.colors), para_style),
-            Paragraph(str(product.order_info), para_style),
-            Paragraph(str(product.size), para_style),
-            Paragraph(str(product.micron), para_style),
-            Paragraph(str(product.job_title), para_style),
-            Paragraph(price, para_style),
-            str(product.order_quantity),
-            Paragraph(total, para_style),
-            product.estimated_delivery_date.strftime('%d/%m/%y') if product.estimated_delivery_date else '',
-            product.actual_delivery_date.strftime('%d/%m/%y') if product.actual_delivery_date else '',
-            Paragraph(str(product.cycle_time), para_style) if product.cycle_time else '',
-            Paragraph(str(product.submission_id), para_style),
-            Paragraph(str(product.approval_status), para_style),
-            Paragraph(str(product.created_by.username), para_style) if product.created_by else '',
-            Paragraph(str(product.approved_by.username), para_style) if product.approved_by else '',
-            Paragraph(str(product.production_status), para_style) if product.production_status else ''
-        ]
-        data.append(row_data)
-
-    col_widths = [
-        0.2*inch,   # S/N
-        0.4*inch,   # Date
-        0.4*inch,   # Job Order
-        0.7*inch,   # Organization
-        0.7*inch,   # Address
-        0.5*inch,   # Contact
-        0.6*inch,   # Package type/ Product
-        0.4*inch,   # Colors
-        0.6*inch,   # Cutting/ Pouch Bag
-        0.35*inch,  # Printing Substrate/ Micron
-        0.35*inch,  # Sealing Type
-        0.5*inch,   # Job Title
-        0.45*inch,  # Price
-        0.3*inch,   # Qty
-        0.45*inch,  # Total
-        0.4*inch,   # Est. Del
-        0.4*inch,   # Act. Del
-        0.4*inch,   # Cycle Time
-        0.4*inch,   # Sub ID
-        0.4*inch,   # Status
-        0.45*inch,  # Created By
-        0.45*inch,  # Approved By
-        0.6*inch    # Production Status
-    ]
 
-    table_style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-        ('TOPPADDING', (0, 0), (-1, -1), 4),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 7),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ])
-
-    table = Table(data, repeatRows=1, colWidths=col_widths)
-    table.setStyle(table_style)
-    elements.append(table)
-   
-    doc.build(elements)
-    return response
 
+@login_required(login_url='user-login')
+@require_http_methods(["POST"])
+def export_job_submit(request, kind):
+    spec = EXPORTS.get(kind)
+    if spec is None:
+        return JsonResponse({'success': False, 'message': 'Unknown export type'}, status=404)
+    if not spec['allowed'](request.user):
+        return JsonResponse({'success': False, 'message': 'You are not authorized to run this export'}, status=403)
+
+    job, created = submit_export(request.user, kind, request.POST)
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return JsonResponse(export_job_payload(job, created), status=202)
+
+    if created:
+        messages.success(request, 'Your export has been queued. It will be ready to download here shortly.')
+    else:
+        messages.info(request, 'The same export is already being prepared.')
+    return redirect('export-jobs')
 
 
 @login_required(login_url='user-login')
-def export_single_product_pdf(request, job_id):
-    from reportlab.platypus import Image, Spacer
-    import os
-    
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="job_order_{job_id}.pdf"'
+def export_job_status(request, pk):
+    job = get_object_or_404(ExportJob, id=pk)
+    if not can_access_job(request.user, job):
+        return JsonResponse({'success': False, 'message': 'Export not found'}, status=404)
+    return JsonResponse(export_job_payload(job))
 
-    doc = SimpleDocTemplate(response, pagesize=landscape(A4), leftMargin=15, rightMargin=15, topMargin=25, bottomMargin=25)
-    elements = []
 
-    styles = getSampleStyleSheet()
-    title_style = styles['Title']
-    title_style.fontSize = 14
-    title_style.spaceAfter = 30
-    elements.append(Paragraph(f"City prints Job Order #{job_id}", title_style))
+@login_required(login_url='user-login')
+def export_job_download(request, pk):
+    job = get_object_or_404(ExportJob, id=pk, status='done')
+    if not can_access_job(request.user, job):
+        return HttpResponse('Export not found', status=404)
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=export_filename(job.kind, job.params))
 
-    product = get_object_or_404(Product, job_order=job_id)
 
-    if product.image:
-        try:
-            img_path = product.image.path
-            img = Image(img_path, width=4*inch, height=3*inch)
-            elements.append(img)
-            elements.append(Spacer(1, 12))
-        except Exception as e:
-            print(f"Error loading image: {e}")
-
-    para_style = ParagraphStyle(
-        'Normal',
-        fontSize=7,
-        leading=8,
-        wordWrap='CJK',
-        alignment=1,
-        encoding='utf-8'
-    )
-    
-    header_style = ParagraphStyle(
-        'Header',
-        fontSize=8,
-        leading=9,
-        fontName='Helvetica-Bold',
-        alignment=1,
-        encoding='utf-8'
-    )
+@login_required(login_url='user-login')
+def export_jobs(request):
+    jobs = ExportJob.objects.filter(requested_by=request.user)[:20]
+    context = {
+        'jobs': jobs,
+        'has_running': any(not job.is_finished() for job in jobs),
+    }
+    return render(request, 'dashboard/export_jobs.html', context)
+
+
+def export_job_payload(job, created=False):
+    return {
+        'success': job.status != 'failed',
+        'job_id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'created': created,
+        'error': job.error,
+        'status_url': reverse('export-job-status', args=[job.id]),
+        'download_url': reverse('export-job-download', args=[job.id]) if job.status == 'done' else None,
+    }
 
-    headers = ['S/N', 'Date', 'Job Order Number', 'Job Name', 'Address', 'Contact', 'Package type/ Product', 'Colors', 
-              'Cutting/ Pouching', 'Thickness / Width', 'Sealing Type', 'Delivery qty', 'Price (NGN)', 'Qty (Kg)', 'Total (NGN)', 
-              'Est. Del', 'Act. Del', 'Cycle Time', 'Sub ID', 'Status', 'Created By', 'Approved By', 'Production Status']
-    
-    data = [[Paragraph(header, header_style) for header in headers]]
 
-    price = str(product.formatted_price()).replace('₦', 'NGN ')
-    total = str(product.formatted_total()).replace('₦', 'NGN ')
-    
-    row_data = [
-        '1',
-        product.date_created.strftime('%d/%m/%y') if product.date_created else '',
-        Paragraph(str(product.job_order), para_style),
-        Paragraph(str(product.organization_name), para_style),
-        Paragraph(str(product.address), para_style),
-        Paragraph(str(product.contact_number), para_style),
-        Paragraph(str(product.print_product), para_style),
-        Paragraph(str(product.colors), para_style),
-        Paragraph(str(product.order_info), para_style),
-        Paragraph(str(product.size), para_style),
-        Paragraph(str(product.micron), para_style),
-        Paragraph(str(product.job_title), para_style),
-        Paragraph(price, para_style),
-        str(product.order_quantity),
-        Paragraph(total, para_style),
-        product.estimated_delivery_date.strftime('%d/%m/%y') if product.estimated_delivery_date else '',
-        product.actual_delivery_date.strftime('%d/%m/%y') if product.actual_delivery_date else '',
-        Paragraph(str(product.cycle_time), para_style) if product.cycle_time else '',
-        Paragraph(str(product.submission_id), para_style),
-        Paragraph(str(product.approval_status), para_style),
-        Paragraph(str(product.created_by.username), para_style) if product.created_by else '',
-        Paragraph(str(product.approved_by.username), para_style) if product.approved_by else ''
-    ]
-    data.append(row_data)
-
-    col_widths = [
-        0.2*inch,   # S/N
-        0.4*inch,   # Date
-        0.4*inch,   # Job Order
-        0.7*inch,   # Organization
-        0.7*inch,   # Address
-        0.5*inch,   # Contact
-        0.6*inch,   # Package type/ Product
-        0.4*inch,   # Colors
-        0.6*inch,   # Cutting/ Pouch Bag
-        0.35*inch,  # Printing Substrate/ Micron
-        0.35*inch,  # Sealing Type
-        0.5*inch,   # Job Title
-        0.45*inch,  # Price
-        0.3*inch,   # Qty
-        0.45*inch,  # Total
-        0.4*inch,   # Est. Del
-        0.4*inch,   # Act. Del
-        0.4*inch,   # Cycle Time
-        0.4*inch,   # Sub ID
-        0.4*inch,   # Status
-        0.45*inch,  # Created By
-        0.45*inch,  # Approved By
-        0.6*inch    # Production Status
-    ]
 
-    table_style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-        ('TOPPADDING', (0, 0), (-1, -1), 4),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 7),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ])
-
-    table = Table(data, repeatRows=1, colWidths=col_widths)
-    table.setStyle(table_style)
-    elements.append(table)
-    
-    doc.build(elements)
-    return response
+@login_required(login_url='user-login')
+def export_single_product_pdf(request, job_id):
+    product = get_object_or_404(Product.objects.select_related('created_by', 'approved_by'), job_order=job_id)
+    path = cached_product_pdf('single', product, SINGLE_PRODUCT_LAYOUT_VERSION, write_single_product_pdf)
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'job_order_{job_id}.pdf', content_type='application/pdf')
 
 
 @login_required(login_url='user-login')
@@ -628,18 +530,7 @@ def product_view(request, job_id):
     if request.method == 'POST':
         new_status = request.POST.get('production_status')
         if new_status:
-            # Update main product status
-            product.production_status = new_status
-            product.production_status_date = timezone.now()
-            product.updated_by = request.user
-            product.save()
-            
-            # Create new status history entry         
-            ProductStatusHistory.objects.create(
-                product=product,
-                status=new_status,
-                updated_by=request.user
-            )
+            record_status(product, new_status, request.user)
             
             messages.success(request, 'Production status updated successfully!')
             return redirect('product-view', job_id=job_id)
@@ -662,22 +553,7 @@ def product_view(request, job_id):
 def delete_status_history(request, status_id):
     try:
         status = ProductStatusHistory.objects.get(id=status_id)
-        product = status.product
-        status.delete()
-        
-        # Get latest status after deletion
-        latest_status = ProductStatusHistory.objects.filter(
-            product=product
-        ).order_by('-created_at').first()
-        
-        if latest_status:
-            product.production_status = latest_status.status
-            product.production_status_date = latest_status.created_at
-        else:
-            product.production_status = None
-            product.production_status_date = None
-            
-        product.save()
+        delete_status(status)
         
         return JsonResponse({
             'success': True,
@@ -696,28 +572,51 @@ def delete_status_history(request, status_id):
 
 
 
+def _status_date(value):
+    return timezone.localtime(value).strftime("%Y-%m-%d %H:%M:%S")
+
+
 @login_required
 def update_production_status(request):
-    if request.method == 'POST':
-        product_id = request.POST.get('product_id')
-        status = request.POST.get('status')
+    """
+    Set the production status of one job order (form fields product_id and
+    status), or of many at once with a JSON body of
+    {"updates": [{"product_id": 1, "status": "Printing"}, ...]}.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error'}, status=400)
+
+    if request.content_type == 'application/json':
         try:
-            product = Product.objects.get(id=product_id)
-            product.production_status = status
-            product.updated_by = request.user
-            product.production_status_date = timezone.now()
-            product.save()
-            
-            print(f"Debug - Updated by: {request.user.username}")  # Debug line
-            
-            return JsonResponse({
-                'status': 'success',
-                'date': timezone.localtime(product.production_status_date).strftime("%Y-%m-%d %H:%M:%S"),
-                'updated_by': request.user.username
-            })
-        except Product.DoesNotExist:
-            return JsonResponse({'status': 'error'}, status=404)
-    return JsonResponse({'status': 'error'}, status=400)
+            updates = json.loads(request.body or b'{}').get('updates')
+            pairs = [(int(update['product_id']), str(update['status']).strip()) for update in updates]
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return JsonResponse({'status': 'error', 'message': 'Send {"updates": [{"product_id": ..., "status": ...}]}'}, status=400)
+        if len(pairs) > PRODUCTION_STATUS_BATCH_LIMIT:
+            return JsonResponse({'status': 'error', 'message': f'At most {PRODUCTION_STATUS_BATCH_LIMIT} updates per request'}, status=400)
+
+        known = set(Product.objects.filter(id__in=[product_id for product_id, _ in pairs]).values_list('id', flat=True))
+        entries = record_statuses([(product_id, status) for product_id, status in pairs if product_id in known], request.user)
+        return JsonResponse({
+            'status': 'success',
+            'updated_by': request.user.username,
+            'results': [
+                {'product_id': entry.product_id, 'status': entry.status, 'date': _status_date(entry.created_at)}
+                for entry in entries
+            ],
+            'missing': sorted({product_id for product_id, _ in pairs if product_id not in known}),
+        })
+
+    product_id = request.POST.get('product_id', '')
+    product = Product.objects.filter(id=product_id).first() if product_id.isdigit() else None
+    if product is None:
+        return JsonResponse({'status': 'error'}, status=404)
+    entry = record_status(product, request.POST.get('status', ''), request.user)
+    return JsonResponse({
+        'status': 'success',
+        'date': _status_date(entry.created_at),
+        'updated_by': request.user.username
+    })
 
 
 
@@ -726,134 +625,24 @@ def update_production_status(request):
 
 def export_product_view_pdf(request, job_id):
     product = get_object_or_404(Product, job_order=job_id)
-    template_path = 'dashboard/product_view_pdf.html'
-    
-    context = {
-        'product': product,
-        'image_url': request.build_absolute_uri(product.image.url) if product.image else None,
-        'base_url': request.build_absolute_uri('/')
-    }
-    
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{product.job_order}_details.pdf"'
-    
-    template = get_template(template_path)
-    html = template.render(context)
-    
-    pisa_status = pisa.CreatePDF(
-        html, 
-        dest=response,
-        link_callback=fetch_resources,
-        encoding='utf-8'
-    )
-    
-    return response if not pisa_status.err else HttpResponse('PDF generation error')
-
-def fetch_resources(uri, rel):
-    """
-    Convert HTML URIs to absolute system paths for PDF generation
-    """
-    if uri.startswith(settings.MEDIA_URL):
-        path = os.path.join(settings.MEDIA_ROOT, uri.replace(settings.MEDIA_URL, ""))
-    elif uri.startswith(settings.STATIC_URL):
-        path = os.path.join(settings.STATIC_ROOT, uri.replace(settings.STATIC_URL, ""))
-    elif uri.startswith("http://") or uri.startswith("https://"):
-        path = uri
-    else:
-        path = os.path.join(settings.STATIC_ROOT, uri)
+    try:
+        path = cached_product_pdf('view', product, template_hash(PRODUCT_VIEW_TEMPLATE), write_product_view_pdf)
+    except ExportError as e:
+        return HttpResponse(str(e))
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{product.job_order}_details.pdf', content_type='application/pdf')
 
-    return path
 
 
 @login_required
 @permission_required('dashboard.can_export_products', raise_exception=True)
 def export_leaves_pdf(request):
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="leave_history.pdf"'
-
-    doc = SimpleDocTemplate(response, pagesize=landscape(A4), leftMargin=15, rightMargin=15, topMargin=25, bottomMargin=25)
-    elements = []
-
-    styles = getSampleStyleSheet()
-    title_style = styles['Title']
-    title_style.fontSize = 14
-    title_style.spaceAfter = 30
-    elements.append(Paragraph("Leave History Report", title_style))
-
-    leaves = Leave.objects.filter(user=request.user).order_by('-applied_date')
-   
-    headers = ['Leave Type', 'Start Date', 'End Date', 'Status', 'Applied Date']
-    data = [[leave.leave_type, leave.start_date, leave.end_date, leave.status, leave.applied_date.strftime('%Y-%m-%d')] 
-            for leave in leaves]
-    
-    data.insert(0, headers)
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 14),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    elements.append(table)
-    doc.build(elements)
-    return response
+    return export_response(request, 'leaves')
 
 
 @login_required(login_url='user-login')
 @allowed_users(allowed_roles=['Admin'])
 def export_all_leaves_pdf(request):
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="all_leaves.pdf"'
-
-    doc = SimpleDocTemplate(response, pagesize=landscape(A4), leftMargin=15, rightMargin=15, topMargin=25, bottomMargin=25)
-    elements = []
-
-    styles = getSampleStyleSheet()
-    title_style = styles['Title']
-    title_style.fontSize = 14
-    title_style.spaceAfter = 30
-    elements.append(Paragraph("All Leave Requests Report", title_style))
-
-    leaves = Leave.objects.all().order_by('-applied_date')
-   
-    headers = ['Staff', 'Leave Type', 'Start Date', 'End Date', 'Status', 'Applied Date', 'Approved By']
-    data = [[
-        leave.user.username,
-        leave.leave_type,
-        leave.start_date,
-        leave.end_date,
-        leave.status,
-        leave.applied_date.strftime('%Y-%m-%d'),
-        leave.approved_by.username if leave.approved_by else '-'
-    ] for leave in leaves]
-    
-    data.insert(0, headers)
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    elements.append(table)
-    doc.build(elements)
-    return response
+    return export_response(request, 'all_leaves')
 
 
 @login_required
@@ -906,16 +695,14 @@ def manage_leaves(request):
         leaves_list = leaves_list.filter(leave_type=leave_type)
     if status:
         leaves_list = leaves_list.filter(status=status)
+    ordering = ['-applied_date', '-id']
     if query:
-        leaves_list = leaves_list.filter(
-            Q(user__username__icontains=query) |
-            Q(reason__icontains=query)
-        )
+        leaves_list = search(leaves_list, query)
+        ordering = ['search_rank'] + ordering
     
     # Pagination
-    paginator = Paginator(leaves_list, 10)
-    page = request.GET.get('page')
-    leaves = paginator.get_page(page)
+    paginator = CursorPaginator(leaves_list.select_related('user'), ordering, per_page=10)
+    leaves = paginator.get_page(request.GET.get('cursor'))
     
     # Get choices for dropdowns
     leave_types = Leave.LEAVE_TYPES
@@ -948,8 +735,20 @@ def apply_leave(request):
 
 @login_required(login_url='user-login')
 def leave_history(request):
-    leaves = Leave.objects.filter(user=request.user).order_by('-applied_date')
-    context = {'leaves': leaves}
+    leaves = Leave.objects.filter(user=request.user)
+    if request.GET.get('format') == 'csv':
+        return stream_csv('leave_history.csv', LEAVE_COLUMNS, leaves.order_by('-applied_date', '-id'))
+
+    leaves = leaves.select_related('approved_by').only(
+        'leave_type', 'start_date', 'end_date', 'status', 'applied_date', 'approved_by__username',
+    )
+    paginator = CursorPaginator(leaves, ['-applied_date', '-id'], per_page=25)
+    total, total_capped = paginator.estimated_total()
+    context = {
+        'leaves': paginator.get_page(request.GET.get('cursor')),
+        'total': total,
+        'total_capped': total_capped,
+    }
     return render(request, 'dashboard/leave_history.html', context)
 
 
@@ -960,22 +759,21 @@ def manage_leaves(request):
     query = request.GET.get('q', '')
     
     # Filter leaves based on search
-    leaves_list = Leave.objects.all().order_by('-applied_date')
+    leaves_list = Leave.objects.all()
+    ordering = ['-applied_date', '-id']
     if query:
-        leaves_list = leaves_list.filter(
-            Q(user__username__icontains=query) |
-            Q(leave_type__icontains=query) |
-            Q(status__icontains=query) |
-            Q(reason__icontains=query)
-        )
+        leaves_list = search(leaves_list, query)
+        ordering = ['search_rank'] + ordering
     
     # Pagination
-    paginator = Paginator(leaves_list, 10)  # Show 10 items per page
-    page = request.GET.get('page')
-    leaves = paginator.get_page(page)
+    paginator = CursorPaginator(leaves_list.select_related('user'), ordering, per_page=10)  # Show 10 items per page
+    leaves = paginator.get_page(request.GET.get('cursor'))
+    total, total_capped = paginator.estimated_total()
     
     context = {
         'leaves': leaves,
+        'total': total,
+        'total_capped': total_capped,
         'query': query,
     }
     return render(request, 'dashboard/manage_leaves.html', context)
@@ -990,7 +788,9 @@ def update_leave_status(request, pk):
         if form.is_valid():
             leave = form.save(commit=False)
             leave.approved_by = request.user
-            leave.save()
+            with transaction.atomic():
+                leave.save()
+                send_leave_notification(leave)
             messages.success(request, 'Leave status updated successfully')
             return redirect('manage-leaves')
     else:
@@ -999,20 +799,10 @@ def update_leave_status(request, pk):
 
 
 def send_leave_notification(leave_request):
-    if leave_request.status == 'Approved':
-        subject = 'Leave Request Approved'
-        message = f'Your {leave_request.leave_type} leave request from {leave_request.start_date} to {leave_request.end_date} has been approved.'
-    elif leave_request.status == 'Rejected':
-        subject = 'Leave Request Rejected'
-        message = f'Your {leave_request.leave_type} leave request from {leave_request.start_date} to {leave_request.end_date} has been rejected.'
-    
-    send_mail(
-        subject,
-        message,
-        settings.EMAIL_HOST_USER,
-        [leave_request.user.email],
-        fail_silently=False,
-    )
+    # Queued in the outbox; call inside the transaction that saves the leave
+    notification = leave_notification(leave_request)
+    if notification:
+        return queue_email(*notification, [leave_request.user.email])
 
 
 @login_required(login_url='user-login')
@@ -1036,99 +826,43 @@ def staff_dashboard(request):
 @login_required
 @permission_required('dashboard.view_dashboard', raise_exception=True)
 def admin_leave_dashboard(request):
-    # Get user statistics with role-based filtering
-    total_staff = User.objects.filter(is_active=True).count()
-    staff_on_leave = User.objects.filter(leave__status='Approved', 
-                                       leave__start_date__lte=timezone.now(),
-                                       leave__end_date__gte=timezone.now()).distinct().count()
-    
-    # Get leave statistics with optimized queries
-    total_leaves = Leave.objects.select_related('user').all()
-    pending_leaves = total_leaves.filter(status='Pending')
-    approved_leaves = total_leaves.filter(status='Approved')
-    rejected_leaves = total_leaves.filter(status='Rejected')
-    
-    # Calculate monthly statistics
-    current_month = timezone.now().month
-    monthly_leaves = total_leaves.filter(applied_date__month=current_month)
-    
-    # Calculate leave types distribution
-    leave_by_type = {
-        'Annual': total_leaves.filter(leave_type='Annual').count(),
-        'Sick': total_leaves.filter(leave_type='Sick').count(),
-        'Personal': total_leaves.filter(leave_type='Personal').count(),
-        'Maternity': total_leaves.filter(leave_type='Maternity').count(),
-        'Paternity': total_leaves.filter(leave_type='Paternity').count(),
-        'Parental': total_leaves.filter(leave_type='Parental').count(),
-        'Bereavement': total_leaves.filter(leave_type='Bereavement').count(),
-        'Compassionate': total_leaves.filter(leave_type='Compassionate').count(),
-        'Study': total_leaves.filter(leave_type='Study').count(),
-        'Sabbatical': total_leaves.filter(leave_type='Sabbatical').count(),
-        'Unpaid': total_leaves.filter(leave_type='Unpaid').count(),
-        'Jury Duty': total_leaves.filter(leave_type='Jury Duty').count(),
-        'Military': total_leaves.filter(leave_type='Military').count(),
-        'Public Service': total_leaves.filter(leave_type='Public Service').count(),
-        'Religious': total_leaves.filter(leave_type='Religious').count(),
-        'Casual': total_leaves.filter(leave_type='Casual').count(),
-        'Compensatory': total_leaves.filter(leave_type='Compensatory').count(),
-        'Medical': total_leaves.filter(leave_type='Medical').count(),
-        'Marriage': total_leaves.filter(leave_type='Marriage').count(),
-        'Voting': total_leaves.filter(leave_type='Voting').count(),
-        'Emergency': total_leaves.filter(leave_type='Emergency').count(),
-        'Other': total_leaves.filter(leave_type='Other').count(),
-    }
+    context = LeaveStats().as_context()
+    context['daily_trend'] = daily_trend('leave')
+    return render(request, 'dashboard/admin_leave_dashboard.html', context)
+
+
+@login_required
+@permission_required('dashboard.view_dashboard', raise_exception=True)
+def team_calendar(request):
+    # Who is away on approved leave, day by day, read from the absence index
+    try:
+        start = date.fromisoformat(request.GET.get('start', ''))
+    except ValueError:
+        start = timezone.localdate()
+    try:
+        days = min(max(int(request.GET.get('days', 14)), 1), 62)
+    except ValueError:
+        days = 14
+    department = request.GET.get('department') or None
+
+    dates = [start + timedelta(days=offset) for offset in range(days)]
+    staff = [
+        {'user': user, 'days': [away.get(day) for day in dates]}
+        for user, away in calendar(start, days, department).items()
+    ]
 
-    
-    # Get recent leave requests with user details
-    recent_requests = pending_leaves.select_related('user').order_by('-applied_date')[:5]
-    
-    # Calculate department-wise leave statistics
-    department_stats = total_leaves.values('user__dashboard_profile__department')\
-        .annotate(total=Count('id'))\
-        .order_by('-total')
-    
     context = {
-        # Staff Statistics
-        'total_staff': total_staff,
-        'staff_on_leave': staff_on_leave,
-        'available_staff': total_staff - staff_on_leave,
-        
-        # Leave Counts
-        'total_leaves': total_leaves.count(),
-        'pending_leaves': pending_leaves.count(),
-        'approved_leaves': approved_leaves.count(),
-        'rejected_leaves': rejected_leaves.count(),
-        
-        # Monthly Statistics
-        'monthly_leaves': monthly_leaves.count(),
-        'monthly_approved': monthly_leaves.filter(status='Approved').count(),
-        'monthly_rejected': monthly_leaves.filter(status='Rejected').count(),
-        
-        # Distribution and Analysis
-        'leave_by_type': leave_by_type,
-        'department_stats': department_stats,
-        'recent_requests': recent_requests,
-        
-        # Metrics
-        'leave_approval_rate': round((approved_leaves.count() / total_leaves.count() * 100), 2) 
-                              if total_leaves.count() > 0 else 0,
-        'average_response_time': calculate_average_response_time(total_leaves),
+        'dates': dates,
+        'staff': staff,
+        'out_per_day': [sum(1 for row in staff if row['days'][i]) for i in range(days)],
+        'department': department,
+        'departments': DEPARTMENT_CHOICES,
+        'days': days,
+        'previous_start': start - timedelta(days=days),
+        'next_start': start + timedelta(days=days),
+        'today': timezone.localdate(),
     }
-    
-    return render(request, 'dashboard/admin_leave_dashboard.html', context)
-
-def calculate_average_response_time(leaves):
-    responded_leaves = leaves.exclude(status='Pending')\
-                           .exclude(response_date__isnull=True)
-    
-    if not responded_leaves:
-        return 0
-        
-    total_response_time = sum(
-        (leave.response_date - leave.applied_date).days 
-        for leave in responded_leaves
-    )
-    return round(total_response_time / responded_leaves.count(), 1)
+    return render(request, 'dashboard/team_calendar.html', context)
 
 
 @login_required(login_url='user-login')
@@ -1202,18 +936,39 @@ def loan_request(request):
 
 @login_required(login_url='user-login')
 def loan_list(request):
-    if request.user.is_superuser or request.user.groups.filter(name='Finance').exists():
-        loans = Loan.objects.all().select_related('user', 'approved_by').order_by('id')
+    if request.user.is_superuser or get_roles(request.user).has_role('Finance'):
+        loans = Loan.objects.all()
     else:
-        loans = Loan.objects.filter(user=request.user).select_related('user', 'approved_by').order_by('id')
-    
+        loans = Loan.objects.filter(user=request.user)
+
+    if request.GET.get('format') == 'csv':
+        return stream_csv('loans.csv', LOAN_COLUMNS, loans.order_by('id'))
+
+    loans = loans.select_related('user').only(
+        'loan_type', 'amount', 'status', 'applied_date',
+        'user__username', 'user__first_name', 'user__last_name',
+    )
+    paginator = CursorPaginator(loans, ['id'], per_page=25)
+    total, total_capped = paginator.estimated_total()
     context = {
-        'loans': loans,
+        'loans': paginator.get_page(request.GET.get('cursor')),
+        'total': total,
+        'total_capped': total_capped,
         'title': 'Loan Applications'
     }
     return render(request, 'dashboard/loan_list.html', context)
 
 
+@login_required(login_url='user-login')
+def loan_status_check(request):
+    # Polled by the loan list to refresh the status badges of the rows on screen
+    ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk.isdigit()]
+    loans = Loan.objects.filter(id__in=ids)
+    if not (request.user.is_superuser or get_roles(request.user).has_role('Finance')):
+        loans = loans.filter(user=request.user)
+    return JsonResponse({'loans': list(loans.values('id', 'status'))})
+
+
 
 
 @login_required(login_url='user-login')
@@ -1223,12 +978,12 @@ def loan_detail(request, pk):
     # Check if user has permission to view this loan
     if not (request.user == loan.user or 
             request.user.is_superuser or 
-            request.user.groups.filter(name='Finance').exists()):
+            get_roles(request.user).has_role('Finance')):
         messages.error(request, 'You do not have permission to view this loan.')
         return redirect('loan-list')
 
     if request.method == 'POST' and (request.user.is_superuser or 
-                                   request.user.groups.filter(name='Finance').exists()):
+                                   get_roles(request.user).has_role('Finance')):
         status = request.POST.get('status')
         response_message = request.POST.get('response_message')
         
@@ -1236,7 +991,9 @@ def loan_detail(request, pk):
         loan.response_message = response_message
         loan.response_date = timezone.now()
         loan.approved_by = request.user
-        loan.save()
+        with transaction.atomic():
+            loan.save()
+            send_loan_notification(loan)
         
         messages.success(request, f'Loan application has been {status}')
         return redirect('loan-list')
@@ -1256,7 +1013,7 @@ def loan_detail(request, pk):
 @login_required
 def loan_update(request, pk):
     loan = Loan.objects.get(id=pk)
-    if request.user != loan.user and not request.user.groups.filter(name__in=['Superuser', 'Finance']).exists():
+    if request.user != loan.user and not get_roles(request.user).has_any_role('Superuser', 'Finance'):
         messages.error(request, 'You are not authorized to update this loan application')
         return redirect('loan-list')
     
@@ -1282,7 +1039,7 @@ def loan_delete(request, pk):
     loan = get_object_or_404(Loan, id=pk)
     
     # Allow both superusers and Finance group members to delete loans
-    if request.user.is_superuser or request.user.groups.filter(name='Finance').exists():
+    if request.user.is_superuser or get_roles(request.user).has_role('Finance'):
         if request.method == 'POST':
             loan.delete()
             messages.success(request, 'Loan application deleted successfully')
@@ -1319,11 +1076,23 @@ def my_loans(request):
 
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser or u.groups.filter(name='Finance Manager').exists())
+@user_passes_test(lambda u: u.is_superuser or get_roles(u).has_role('Finance Manager'))
 def pending_loans(request):
-    loans = Loan.objects.filter(status='Pending').order_by('-applied_date')
+    loans = Loan.objects.filter(status='Pending')
+    if request.GET.get('format') == 'csv':
+        return stream_csv('pending_loans.csv', LOAN_COLUMNS, loans.order_by('-applied_date', '-id'))
+
+    loans = loans.select_related('user__dashboard_profile').only(
+        'loan_type', 'amount', 'status', 'applied_date',
+        'user__username', 'user__first_name', 'user__last_name',
+        'user__dashboard_profile__department',
+    )
+    paginator = CursorPaginator(loans, ['-applied_date', '-id'], per_page=25)
+    total, total_capped = paginator.estimated_total()
     context = {
-        'loans': loans,
+        'loans': paginator.get_page(request.GET.get('cursor')),
+        'total': total,
+        'total_capped': total_capped,
         'title': 'Pending Loans'
     }
     return render(request, 'dashboard/pending_loans.html', context)
@@ -1339,206 +1108,20 @@ def pending_loans(request):
 @login_required(login_url='user-login')
 @permission_required(['dashboard.view_loan', 'dashboard.change_loan'], raise_exception=True)
 def admin_loan_dashboard(request):
-    # Cache key for dashboard statistics
-    cache_key = f'loan_dashboard_stats_{request.user.id}'
-    cached_stats = cache.get(cache_key)
-
-    if cached_stats:
-        return render(request, 'dashboard/admin_loan_dashboard.html', cached_stats)
-
-    # Optimize queries with select_related and prefetch_related
-    total_loans = Loan.objects.select_related('user', 'approved_by')\
-                             .prefetch_related('user__groups', 'user__dashboard_profile')
-
-    # Get user statistics with role-based filtering
-    total_staff = User.objects.filter(is_active=True).count()
-    current_time = timezone.now()
-    staff_with_loans = User.objects.filter(
-        loan__status='Approved',
-        loan__start_date__lte=current_time,
-        loan__end_date__gte=current_time
-    ).distinct().count()
-
-    # Get loan statistics with optimized queries
-    pending_loans = total_loans.filter(status='Pending')
-    approved_loans = total_loans.filter(status='Approved')
-    rejected_loans = total_loans.filter(status='Rejected')
-
-    # Calculate monthly and yearly statistics
-    current_month = current_time.month
-    current_year = current_time.year
-    monthly_loans = total_loans.filter(
-        applied_date__month=current_month,
-        applied_date__year=current_year
-    )
-
-    # Calculate loan types distribution using annotation
-    loan_types = dict(Loan.LOAN_TYPES)
-    loan_by_type = {
-        loan_type: total_loans.filter(loan_type=loan_type).count()
-        for loan_type, _ in loan_types.items()
-    }
-
-    # Calculate financial metrics
-    loan_amounts = total_loans.aggregate(
-        total=Sum('amount'),
-        approved=Sum('amount', filter=Q(status='Approved')),
-        pending=Sum('amount', filter=Q(status='Pending'))
-    )
-
-    # Calculate department statistics with annotations
-    department_stats = total_loans.values('user__dashboard_profile__department')\
-        .annotate(
-            total=Count('id'),
-            total_amount=Sum('amount'),
-            approved_count=Count('id', filter=Q(status='Approved'))
-        ).order_by('-total')
-
-    # Get recent loan requests with user details
-    recent_requests = pending_loans.select_related('user')\
-        .order_by('-applied_date')[:5]
-
-    context = {
-        # Staff Statistics
-        'total_staff': total_staff,
-        'staff_with_loans': staff_with_loans,
-        'available_staff': total_staff - staff_with_loans,
-
-        # Loan Counts
-        'total_loans': total_loans.count(),
-        'pending_loans': pending_loans.count(),
-        'approved_loans': approved_loans.count(),
-        'rejected_loans': rejected_loans.count(),
-
-        # Monthly Statistics
-        'monthly_loans': monthly_loans.count(),
-        'monthly_approved': monthly_loans.filter(status='Approved').count(),
-        'monthly_rejected': monthly_loans.filter(status='Rejected').count(),
-
-        # Distribution and Analysis
-        'loan_by_type': loan_by_type,
-        'department_stats': department_stats,
-        'recent_requests': recent_requests,
-
-        # Financial Metrics
-        'total_loan_amount': loan_amounts.get('total') or 0,
-        'approved_loan_amount': loan_amounts.get('approved') or 0,
-        'pending_loan_amount': loan_amounts.get('pending') or 0,
-
-        # Performance Metrics
-        'loan_approval_rate': calculate_loan_approval_rate(total_loans),
-        'average_response_time': calculate_average_response_time(total_loans),
-        
-        # Additional Metrics
-        'current_month': current_time.strftime('%B %Y'),
-        'loan_types': loan_types,
-    }
-
-    # Cache the statistics for 1 hour
-    cache.set(cache_key, context, 3600)
-
+    # One snapshot shared by all viewers, refreshed when loans change
+    context = loan_dashboard_context()
     return render(request, 'dashboard/admin_loan_dashboard.html', context)
 
-def calculate_loan_approval_rate(loans):
-    total_count = loans.count()
-    if total_count == 0:
-        return 0
-    approved_count = loans.filter(status='Approved').count()
-    return round((approved_count / total_count * 100), 2)
-
-
-
-
 
 @login_required(login_url='user-login')
 @permission_required('dashboard.view_loan', raise_exception=True)
 def export_loans_pdf(request):
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="loan_history.pdf"'
-
-    doc = SimpleDocTemplate(response, pagesize=landscape(A4), leftMargin=15, rightMargin=15, topMargin=25, bottomMargin=25)
-    elements = []
-
-    styles = getSampleStyleSheet()
-    title_style = styles['Title']
-    title_style.fontSize = 14
-    title_style.spaceAfter = 30
-    elements.append(Paragraph("Loan History Report", title_style))
-
-    loans = Loan.objects.filter(user=request.user).order_by('-applied_date')
-    
-    headers = ['Loan Type', 'Amount', 'Start Date', 'End Date', 'Status', 'Applied Date']
-    data = [[loan.loan_type, f"${loan.amount}", loan.start_date, loan.end_date, 
-             loan.status, loan.applied_date.strftime('%Y-%m-%d')] for loan in loans]
-    
-    data.insert(0, headers)
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 14),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    elements.append(table)
-    doc.build(elements)
-    return response
+    return export_response(request, 'loans')
 
 @login_required(login_url='user-login')
 @permission_required(['dashboard.view_loan', 'dashboard.change_loan'], raise_exception=True)
 def export_all_loans_pdf(request):
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="all_loans.pdf"'
-
-    doc = SimpleDocTemplate(response, pagesize=landscape(A4), leftMargin=15, rightMargin=15, topMargin=25, bottomMargin=25)
-    elements = []
-
-    styles = getSampleStyleSheet()
-    title_style = styles['Title']
-    title_style.fontSize = 14
-    title_style.spaceAfter = 30
-    elements.append(Paragraph("All Loan Applications Report", title_style))
-
-    loans = Loan.objects.all().order_by('-applied_date')
-    
-    headers = ['Staff', 'Loan Type', 'Amount', 'Start Date', 'End Date', 'Status', 'Applied Date', 'Approved By']
-    data = [[
-        loan.user.username,
-        loan.loan_type,
-        f"${loan.amount}",
-        loan.start_date,
-        loan.end_date,
-        loan.status,
-        loan.applied_date.strftime('%Y-%m-%d'),
-        loan.approved_by.username if loan.approved_by else '-'
-    ] for loan in loans]
-    
-    data.insert(0, headers)
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    elements.append(table)
-    doc.build(elements)
-    return response
+    return export_response(request, 'all_loans')
 
 @login_required(login_url='user-login')
 @permission_required('dashboard.view_loan', raise_exception=True)
@@ -1576,7 +1159,6 @@ def loan_history(request):
 @permission_required('dashboard.view_loan', raise_exception=True)
 def manage_loans(request):
     loans_list = Loan.objects.all().order_by('-applied_date')
-    loans = Loan.objects.all()
     search_query = request.GET.get('search')
     
     # Get filter parameters
@@ -1595,23 +1177,14 @@ def manage_loans(request):
         loans_list = loans_list.filter(loan_type=loan_type)
     if status:
         loans_list = loans_list.filter(status=status)
-    if query:
-        loans_list = loans_list.filter(
-            Q(user__username__icontains=query) |
-            Q(reason__icontains=query)
-        )
-        
-    if search_query:
-        loans = loans.filter(
-            Q(user__username__icontains=search_query) |
-            Q(loan_type__icontains=search_query) |
-            Q(reason__icontains=search_query)
-        )
+    ordering = ['-applied_date', '-id']
+    if query or search_query:
+        loans_list = search(loans_list, query or search_query)
+        ordering = ['search_rank'] + ordering
     
     # Pagination
-    paginator = Paginator(loans_list, 10)
-    page = request.GET.get('page')
-    loans = paginator.get_page(page)
+    paginator = CursorPaginator(loans_list, ordering, per_page=10)
+    loans = paginator.get_page(request.GET.get('cursor'))
     
     context = {
         'loans': loans,
@@ -1631,10 +1204,10 @@ def update_loan_status(request, pk):
         if form.is_valid():
             loan = form.save(commit=False)
             loan.approved_by = request.user
-            loan.save()
-            
-            # Send notification to user
-            send_loan_notification(loan)
+            with transaction.atomic():
+                loan.save()
+                # Send notification to user
+                send_loan_notification(loan)
             
             messages.success(request, 'Loan status updated successfully')
             return redirect('loan-list')  # Redirect to see all loans
@@ -1645,20 +1218,10 @@ def update_loan_status(request, pk):
 
 
 def send_loan_notification(loan_request):
-    if loan_request.status == 'Approved':
-        subject = 'Loan Application Approved'
-        message = f'Your {loan_request.loan_type} loan application for ${loan_request.amount} has been approved.'
-    elif loan_request.status == 'Rejected':
-        subject = 'Loan Application Rejected'
-        message = f'Your {loan_request.loan_type} loan application for ${loan_request.amount} has been rejected.'
-    
-    send_mail(
-        subject,
-        message,
-        settings.EMAIL_HOST_USER,
-        [loan_request.user.email],
-        fail_silently=False,
-    )
+    # Queued in the outbox; call inside the transaction that saves the loan
+    notification = loan_notification(loan_request)
+    if notification:
+        return queue_email(*notification, [loan_request.user.email])
 
 
 
@@ -1681,13 +1244,48 @@ def staff_loan_dashboard(request):
 
 
 
+def bulk_decision_response(request, model, redirect_to):
+    # Form posts send ids[]; API clients may post JSON {"ids": [...], "action": ..., "message": ...}
+    if request.content_type == 'application/json':
+        try:
+            payload = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'Invalid JSON'}, status=400)
+    else:
+        payload = {
+            'ids': request.POST.getlist('ids') or request.POST.getlist('loan_ids'),
+            'action': request.POST.get('action'),
+            'message': request.POST.get('message') or None,
+        }
+    wants_json = request.content_type == 'application/json' or request.headers.get('x-requested-with') == 'XMLHttpRequest'
+
+    try:
+        results = bulk_decide(model, payload.get('ids') or [], payload.get('action'), request.user, payload.get('message'))
+    except DecisionError as e:
+        if wants_json:
+            return JsonResponse({'success': False, 'message': str(e)}, status=400)
+        messages.error(request, str(e))
+        return redirect(redirect_to)
+
+    decided = sum(1 for outcome in results.values() if outcome in ('Approved', 'Rejected'))
+    if wants_json:
+        return JsonResponse({'success': True, 'decided': decided, 'results': results})
+    messages.success(request, f'{decided} of {len(results)} request(s) updated')
+    return redirect(redirect_to)
+
+
 @login_required(login_url='user-login')
 @permission_required('dashboard.change_loan', raise_exception=True)
+@require_http_methods(["POST"])
 def bulk_update_loans(request):
-    if request.method == 'POST':
-        loan_ids = request.POST.getlist('loan_ids')
-        action = request.POST.get('action')
-        Loan.objects.filter(id__in=loan_ids).update(status=action)
+    return bulk_decision_response(request, Loan, 'pending-loans')
+
+
+@login_required(login_url='user-login')
+@permission_required('dashboard.add_leave', raise_exception=True)
+@require_http_methods(["POST"])
+def bulk_update_leaves(request):
+    return bulk_decision_response(request, Leave, 'manage-leaves')
 
 
 @login_required(login_url='user-login')
@@ -50,10 +50,12 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'dashboard.query_budget.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'dashboard.roles.RoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -164,3 +166,66 @@ EMAIL_HOST_USER_PASSWORD = 'yugy hupx fslq fmlx'  # Replace with your app passwo
 
 
 Image.MAX_IMAGE_PIXELS = None  # For production, set a reasonable limit
+
+
+# Background exports: render in a thread pool inside the web process.
+# Set EXPORT_JOBS_IN_PROCESS to False and run `manage.py process_export_jobs --loop`
+# to render them in a separate worker instead.
+EXPORT_JOBS_IN_PROCESS = True
+EXPORT_JOB_WORKERS = 2
+# A running job not finished after EXPORT_JOB_TIMEOUT_SECONDS is failed, and a
+# pending one older than EXPORT_JOB_REQUEUE_SECONDS is queued again when
+# requested, so jobs lost with a restarted process are not reused forever.
+EXPORT_JOB_TIMEOUT_SECONDS = 900
+EXPORT_JOB_REQUEUE_SECONDS = 300
+
+# Rendered single job order PDFs, keyed on product revision and evicted
+# least-recently-used first once the directory grows past the limit
+PDF_CACHE_DIR = os.path.join(BASE_DIR, 'pdf_cache')
+PDF_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# How long the aggregated index page chart series stay cached, in seconds
+CHART_CACHE_SECONDS = 300
+
+# Seconds to keep each user's resolved groups in the cache between requests.
+# 0 resolves them once per request; only raise it with a shared cache backend.
+ROLE_CACHE_SECONDS = 0
+
+# Per-request query instrumentation, stored as QueryReport rows and summarised
+# with `manage.py query_report`. QUERY_BUDGETS maps URL names to the most
+# queries a view may run; QUERY_BUDGET_RAISE turns overruns into errors.
+QUERY_BUDGET_ENABLED = False
+QUERY_BUDGET_RAISE = False
+QUERY_BUDGET_DEFAULT = 50
+QUERY_BUDGETS = {
+    'dashboard-index': 15,
+    'dashboard-products': 15,
+    'dashboard-order': 15,
+    'loan-list': 10,
+}
+
+# Leave and loan notification emails are queued in OutboxEmail and sent in
+# batches over one connection. With EMAIL_OUTBOX_IN_PROCESS a background
+# thread sends every due email after each commit and wakes up again when the
+# next retry falls due; otherwise run `manage.py send_outbox --loop`.
+# Failed sends are retried after EMAIL_OUTBOX_RETRY_SECONDS, doubling each time.
+EMAIL_OUTBOX_IN_PROCESS = True
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_SECONDS = 60
+EMAIL_OUTBOX_LEASE_SECONDS = 300
+
+# The admin loan dashboard figures are a cached snapshot shared by every viewer.
+# Loan changes bump a version counter in the database, which marks the snapshot
+# stale in every process; it is recomputed in a background thread while
+# the old figures are still served; set LOAN_DASHBOARD_REFRESH_IN_PROCESS to
+# False to recompute during the request instead. Snapshots are dropped after
+# LOAN_DASHBOARD_CACHE_SECONDS whatever happens.
+LOAN_DASHBOARD_CACHE_SECONDS = 3600
+LOAN_DASHBOARD_REFRESH_IN_PROCESS = True
+
+# Leave and loan requests are totalled per day, department, type and status in
+# DailyRollup. Saves and deletes log the days they touch; `manage.py refresh_rollups`
+# (add --loop to keep running) recomputes just those days. The admin dashboards
+# chart the last ROLLUP_TREND_DAYS days from the rollups.
+ROLLUP_TREND_DAYS = 30